@@ -3,6 +3,9 @@ import os
 import sys
 import random
 import pandas as pd
+from rk_table_cache import table_cache
+from rk_excel_stream import ExcelRowStream
+from rk_state_store import advance_index
 
 class RK_Excel_File_State_Looper:
     @classmethod
@@ -36,6 +39,11 @@ class RK_Excel_File_State_Looper:
                     "default": " ",
                     "multiline": False
                 })
+            },
+            "optional": {
+                # "streaming" reads rows with openpyxl in read-only mode instead of loading a DataFrame;
+                # it suits increment loops, since wrap-around and random rows re-stream the sheet from the top
+                "read_mode": (["dataframe", "streaming"], {"default": "dataframe"})
             }
         }
 
@@ -44,17 +52,17 @@ class RK_Excel_File_State_Looper:
     FUNCTION = "read_row"
     CATEGORY = "RK_tools_v02"
 
-    df_cache = None
-    df_path = None
-
     def load_excel(self, file_path):
-        # Cache the DataFrame to avoid reloading on each call
-        if RK_Excel_File_State_Looper.df_path != file_path:
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"Excel file not found: {file_path}")
-            RK_Excel_File_State_Looper.df_cache = pd.read_excel(file_path, header=None)
-            RK_Excel_File_State_Looper.df_path = file_path
-        return RK_Excel_File_State_Looper.df_cache
+        # Cache the DataFrame to avoid reloading on each call (reloaded when the file changes)
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"Excel file not found: {file_path}")
+        return table_cache.get(file_path, lambda: pd.read_excel(file_path, header=None), kind="dataframe", header=None)
+
+    def open_stream(self, file_path):
+        # One forward-only cursor per file version, kept in the table cache between calls
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"Excel file not found: {file_path}")
+        return table_cache.get(file_path, lambda: ExcelRowStream(file_path), kind="stream")
 
     def get_row_count(self, df):
         return len(df)
@@ -64,24 +72,15 @@ class RK_Excel_File_State_Looper:
         state_file = f"{base}_state_{loop_mode}_{start_index}_{end_index}_{step_size}.txt"
         return state_file
 
-    def read_current_index(self, state_file, start_index):
-        if os.path.isfile(state_file):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    val = f.read().strip()
-                    return int(val)
-            except:
-                pass
-        return start_index
-
-    def write_current_index(self, state_file, index):
-        with open(state_file, 'w', encoding='utf-8') as f:
-            f.write(str(index))
-
-    def read_row(self, file_path, loop_mode, start_index, end_index, step_size, delimiter):
+    def read_row(self, file_path, loop_mode, start_index, end_index, step_size, delimiter, read_mode="dataframe"):
         try:
-            df = self.load_excel(file_path)
-            total_rows = self.get_row_count(df)
+            if read_mode == "streaming":
+                rows = self.open_stream(file_path)
+                # Sheets without stored dimensions have no known length; trust end_index then
+                total_rows = rows.row_count or end_index + 1
+            else:
+                df = self.load_excel(file_path)
+                total_rows = self.get_row_count(df)
 
             # Adjust indices if out of range
             if start_index < 0:
@@ -102,17 +101,16 @@ class RK_Excel_File_State_Looper:
                 chosen_index = random.randint(start_index, end_index)
 
             elif loop_mode == "increment":
-                current_index = self.read_current_index(state_file, start_index)
-                chosen_index = current_index
-                new_index = chosen_index + step_size
-                if new_index > end_index:
-                    new_index = start_index
-                self.write_current_index(state_file, new_index)
+                # Atomic fetch-and-advance, safe with several workers on one sheet
+                chosen_index = advance_index(state_file, start_index, end_index, step_size)
 
             else:
                 chosen_index = start_index
 
-            row_data = df.iloc[chosen_index].tolist()
+            if read_mode == "streaming":
+                row_data = rows[chosen_index]
+            else:
+                row_data = df.iloc[chosen_index].tolist()
             row_text = delimiter.join(map(str, row_data))
 
             # Remove leading/trailing quotes (standard and fancy quotes)
@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
+import atexit
+from rk_text_buffer import ChunkedTextBuffer, process_spill_path, remove_stale_spill_files
+
+SPILL_NAME = "RK_Accumulate_Text_Multiline"
+
+# Spill files of earlier runs that exited (or crashed) are never read again
+remove_stale_spill_files(SPILL_NAME)
 
 class RK_Accumulate_Text_Multiline:
-    # Class variable to store accumulated text
-    accumulated_text = ""
+    # Class variable to store accumulated text (as chunks; joined only when read).
+    # The spill file is per process, so two ComfyUI instances never share one.
+    buffer = ChunkedTextBuffer(process_spill_path(SPILL_NAME))
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -21,19 +29,35 @@ class RK_Accumulate_Text_Multiline:
                     "default": "\n"  # Default to newline
                 }),
                 "reset_accumulation": (["no", "yes"], {"default": "no"})
+            },
+            "optional": {
+                # full: the whole accumulated text; new_block: only what this run added (no full join)
+                "output_mode": (["full", "new_block"], {"default": "full"}),
+                # Move the text to an append-only file once it's larger than this (0 = never).
+                # Once spilled, "full" re-reads the whole file on every run; use new_block and
+                # the accumulated_file path to avoid that.
+                "spill_threshold_mb": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 65536,
+                    "step": 1
+                }),
             }
         }
 
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("accumulated_string",)
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("accumulated_string", "accumulated_file")
     FUNCTION = "accumulate_text"
     CATEGORY = "RK_tools_v02"
 
-    def accumulate_text(self, input_text_1, input_text_2, separator, reset_accumulation):
+    def accumulate_text(self, input_text_1, input_text_2, separator, reset_accumulation, output_mode="full", spill_threshold_mb=0):
         try:
+            buffer = self.__class__.buffer
+
             # Reset if requested
             if reset_accumulation == "yes":
-                self.__class__.accumulated_text = ""
+                buffer.clear()
+            buffer.spill_threshold = spill_threshold_mb * 2**20
 
             # Combine inputs into a new block of text
             if input_text_1.strip() and input_text_2.strip():
@@ -43,21 +67,30 @@ class RK_Accumulate_Text_Multiline:
             else:
                 new_block = input_text_2
 
-            # If there is already accumulated text and new_block is not empty
-            if self.__class__.accumulated_text.strip() and new_block.strip():
-                self.__class__.accumulated_text += separator + new_block
+            # Only blocks with text are added, so a non-empty buffer always has text
+            if new_block.strip():
+                if not buffer.is_empty:
+                    buffer.append(separator + new_block)
+                else:
+                    # If accumulated text is empty, just set it to the new block
+                    buffer.append(new_block)
             else:
-                # If accumulated text is empty, just set it to the new block
-                # Or if the new block is empty, do nothing
-                if new_block.strip():
-                    self.__class__.accumulated_text += new_block
+                # If the new block is empty, do nothing
+                new_block = ""
+
+            accumulated_file = buffer.spill_path if buffer.spilled else ""
 
-            return (self.__class__.accumulated_text,)
+            if output_mode == "new_block":
+                return (new_block, accumulated_file)
+            return (buffer.text(), accumulated_file)
 
         except Exception as e:
             print(f"Error in RK_Accumulate_Text_Multiline: {str(e)}")
             raise e
 
+# Delete this process's spill file on a normal exit
+atexit.register(RK_Accumulate_Text_Multiline.buffer.clear)
+
 # Node class mappings
 NODE_CLASS_MAPPINGS = {
     "RK_Accumulate_Text_Multiline": RK_Accumulate_Text_Multiline
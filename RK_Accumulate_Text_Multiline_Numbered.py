@@ -1,9 +1,53 @@
 # -*- coding: utf-8 -*-
+import os
+import hashlib
+from rk_text_buffer import ChunkedTextBuffer, TextCheckpoint, SessionRegistry, SPILL_DIR
+
+# Sessions unused for this long are dropped from memory (their checkpoints stay on disk)
+SESSION_TTL = int(os.environ.get("RK_ACCUMULATE_TTL", str(6 * 3600)))
+MAX_SESSIONS = int(os.environ.get("RK_ACCUMULATE_SESSIONS", "64"))
+CHECKPOINT_DIR = os.path.join(SPILL_DIR, "numbered")
+
+
+class AccumulatorSession:
+    """Accumulated text and line count of one node (or one session_key)."""
+
+    def __init__(self, key):
+        self.key = key
+        self.buffer = ChunkedTextBuffer()
+        self.line_count = 1
+        self.checkpoint = None
+
+    def enable_checkpoint(self):
+        if self.checkpoint is not None:
+            return
+        digest = hashlib.sha1(self.key.encode("utf-8")).hexdigest()[:16]
+        self.checkpoint = TextCheckpoint(os.path.join(CHECKPOINT_DIR, digest))
+        restored = self.checkpoint.load() if self.buffer.is_empty else None
+        if restored is not None:
+            # Picks up where an earlier worker stopped
+            text, state = restored
+            self.buffer.append(text)
+            self.line_count = state.get("line_count", 1)
+            print(f"[DEBUG] Restored accumulator '{self.key}' from checkpoint ({len(text)} characters, next line {self.line_count})")
+        else:
+            self.checkpoint.reset(self.buffer.text(), line_count=self.line_count)
+
+    def append(self, text):
+        self.buffer.append(text)
+        if self.checkpoint is not None:
+            self.checkpoint.append(text, line_count=self.line_count)
+
+    def clear(self):
+        self.buffer.clear()
+        self.line_count = 1
+        if self.checkpoint is not None:
+            self.checkpoint.clear()
+
 
 class RK_Accumulate_Text_Multiline_Numbered:
-    # Class variables to store accumulated text and line count
-    accumulated_text = ""
-    line_count = 1
+    # Accumulated text and line count per node id (or session_key), in a bounded registry
+    sessions = SessionRegistry(AccumulatorSession, max_entries=MAX_SESSIONS, ttl_seconds=SESSION_TTL)
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -23,6 +67,19 @@ class RK_Accumulate_Text_Multiline_Numbered:
                 }),
                 "reset_accumulation": (["no", "yes"], {"default": "no"}),
                 "line_numbering": (["no", "yes"], {"default": "no"})
+            },
+            "optional": {
+                # Nodes with the same key share one accumulation; empty = this node only
+                "session_key": ("STRING", {
+                    "multiline": False,
+                    "default": ""
+                }),
+                # Keep an append-only copy on disk so the accumulation survives a restart.
+                # Needs a session_key: node ids repeat across workflows and workers.
+                "checkpoint": ("BOOLEAN", {"default": False}),
+            },
+            "hidden": {
+                "unique_id": "UNIQUE_ID"
             }
         }
 
@@ -31,12 +88,20 @@ class RK_Accumulate_Text_Multiline_Numbered:
     FUNCTION = "accumulate_text"
     CATEGORY = "RK_tools_v02"
 
-    def accumulate_text(self, input_text_1, input_text_2, separator, reset_accumulation, line_numbering):
+    def accumulate_text(self, input_text_1, input_text_2, separator, reset_accumulation, line_numbering, session_key="", checkpoint=False, unique_id=None):
         try:
+            session_key = session_key.strip()
+            if checkpoint and not session_key:
+                # A checkpoint keyed on the node id would be picked up by any workflow reusing that id
+                raise ValueError("checkpoint needs a session_key that is unique to this accumulation")
+            key = session_key or f"node:{unique_id}"
+            session = self.__class__.sessions.get(key)
+            if checkpoint:
+                session.enable_checkpoint()
+
             # Reset if requested
             if reset_accumulation == "yes":
-                self.__class__.accumulated_text = ""
-                self.__class__.line_count = 1
+                session.clear()
 
             # Combine inputs into a new block of text
             if input_text_1.strip() and input_text_2.strip():
@@ -48,7 +113,7 @@ class RK_Accumulate_Text_Multiline_Numbered:
 
             # If no new text, just return current state
             if not new_block.strip():
-                return (self.__class__.accumulated_text,)
+                return (session.buffer.text(),)
 
             # Split the new block into lines
             new_lines = new_block.split("\n")
@@ -59,8 +124,8 @@ class RK_Accumulate_Text_Multiline_Numbered:
                 # Add line numbers to each line
                 for line in new_lines:
                     if line.strip():
-                        formatted_block.append(f"{self.__class__.line_count}. {line}")
-                        self.__class__.line_count += 1
+                        formatted_block.append(f"{session.line_count}. {line}")
+                        session.line_count += 1
                     else:
                         # Even if line is empty, we might still increment line_count if desired.
                         # For simplicity, let's not increment on empty lines, so numbering only increments on actual text lines.
@@ -72,19 +137,16 @@ class RK_Accumulate_Text_Multiline_Numbered:
             # Join the formatted lines back into a single block
             new_block_formatted = "\n".join(formatted_block)
 
-            # Append to the accumulated text
+            # Append to the accumulated text; earlier text is never rescanned or copied
             # If there's already accumulated text, add the separator
-            if self.__class__.accumulated_text.strip() and new_block_formatted.strip():
-                self.__class__.accumulated_text += separator + new_block_formatted
+            # (only blocks with text are added, so a non-empty buffer always has text)
+            if not session.buffer.is_empty:
+                session.append(separator + new_block_formatted)
             else:
-                # If there's no accumulated text yet or new_block_formatted is the first significant addition
-                if not self.__class__.accumulated_text.strip():
-                    self.__class__.accumulated_text = new_block_formatted
-                else:
-                    # accumulated text is empty or no new meaningful text
-                    self.__class__.accumulated_text += new_block_formatted
-
-            return (self.__class__.accumulated_text,)
+                # If there's no accumulated text yet, new_block_formatted is the first addition
+                session.append(new_block_formatted)
+
+            return (session.buffer.text(),)
 
         except Exception as e:
             print(f"Error in RK_Accumulate_Text_Multiline_Numbered: {str(e)}")
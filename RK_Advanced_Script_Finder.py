@@ -8,6 +8,9 @@ import numpy as np
 import torch
 from PIL import Image
 
+# INPUT_TYPES lists the live ComfyUI node registry, so it can't be served from the manifest
+RK_LAZY_LOAD = False
+
 class RK_Advanced_Script_Finder:
     def __init__(self):
         self.node_list = []
@@ -2,6 +2,8 @@ import os
 import sys
 import random
 import csv
+from rk_table_cache import table_cache
+from rk_state_store import advance_index
 
 class RK_Excel_File_State_Looper:
     @classmethod
@@ -44,32 +46,25 @@ class RK_Excel_File_State_Looper:
     FUNCTION = "read_row"
     CATEGORY = "RK_tools_v02"
 
-    # Cache variables
-    file_data_cache = None
-    file_path_cache = None
-
     def load_file(self, file_path, delimiter):
         """
-        Loads a CSV file into a list of lists and caches it.
+        Loads a CSV file into a list of lists, cached in the shared table cache.
         """
-        if RK_Excel_File_State_Looper.file_path_cache != file_path:
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
 
-            _, ext = os.path.splitext(file_path)
-            ext = ext.lower()
+        _, ext = os.path.splitext(file_path)
+        ext = ext.lower()
 
-            if ext != ".csv":
-                raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
+        if ext != ".csv":
+            raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
 
+        def read_rows():
             with open(file_path, "r", encoding="utf-8") as f:
                 reader = csv.reader(f, delimiter=delimiter)
-                data = list(reader)
-
-            RK_Excel_File_State_Looper.file_data_cache = data
-            RK_Excel_File_State_Looper.file_path_cache = file_path
+                return list(reader)
 
-        return RK_Excel_File_State_Looper.file_data_cache
+        return table_cache.get(file_path, read_rows, kind="rows", delimiter=delimiter)
 
     def get_row_count(self, data):
         return len(data)
@@ -79,20 +74,6 @@ class RK_Excel_File_State_Looper:
         state_file = f"{base}_state_{loop_mode}_{start_index}_{end_index}_{step_size}.txt"
         return state_file
 
-    def read_current_index(self, state_file, start_index):
-        if os.path.isfile(state_file):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    val = f.read().strip()
-                    return int(val)
-            except:
-                pass
-        return start_index
-
-    def write_current_index(self, state_file, index):
-        with open(state_file, 'w', encoding='utf-8') as f:
-            f.write(str(index))
-
     def read_row(self, file_path, loop_mode, start_index, end_index, step_size, delimiter):
         try:
             data = self.load_file(file_path, delimiter)
@@ -117,12 +98,8 @@ class RK_Excel_File_State_Looper:
                 chosen_index = random.randint(start_index, end_index)
 
             elif loop_mode == "increment":
-                current_index = self.read_current_index(state_file, start_index)
-                chosen_index = current_index
-                new_index = chosen_index + step_size
-                if new_index > end_index:
-                    new_index = start_index
-                self.write_current_index(state_file, new_index)
+                # Atomic fetch-and-advance, safe with several workers on one sheet
+                chosen_index = advance_index(state_file, start_index, end_index, step_size)
 
             else:
                 chosen_index = start_index
@@ -2,6 +2,8 @@ import os
 import sys
 import random
 import csv
+from rk_table_cache import table_cache
+from rk_state_store import advance_index
 
 class RK_CSV_File_State_Looper_v01:
     @classmethod
@@ -49,32 +51,25 @@ class RK_CSV_File_State_Looper_v01:
     FUNCTION = "read_row"
     CATEGORY = "RK_tools_v02"
 
-    # Cache variables
-    file_data_cache = None
-    file_path_cache = None
-
     def load_file(self, file_path, delimiter):
         """
-        Loads a CSV file into a list of lists and caches it.
+        Loads a CSV file into a list of lists, cached in the shared table cache.
         """
-        if RK_CSV_File_State_Looper_v01.file_path_cache != file_path:
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
 
-            _, ext = os.path.splitext(file_path)
-            ext = ext.lower()
+        _, ext = os.path.splitext(file_path)
+        ext = ext.lower()
 
-            if ext != ".csv":
-                raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
+        if ext != ".csv":
+            raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
 
+        def read_rows():
             with open(file_path, "r", encoding="utf-8") as f:
                 reader = csv.reader(f, delimiter=delimiter)
-                data = list(reader)
-
-            RK_CSV_File_State_Looper_v01.file_data_cache = data
-            RK_CSV_File_State_Looper_v01.file_path_cache = file_path
+                return list(reader)
 
-        return RK_CSV_File_State_Looper_v01.file_data_cache
+        return table_cache.get(file_path, read_rows, kind="rows", delimiter=delimiter)
 
     def get_row_count(self, data):
         return len(data)
@@ -89,20 +84,6 @@ class RK_CSV_File_State_Looper_v01:
         state_file = f"{base}_state_{orientation}_{column_name}_{loop_mode}_{start_index}_{end_index}_{step_size}.txt" # Added column_name to state file name
         return state_file
 
-    def read_current_index(self, state_file, start_index):
-        if os.path.isfile(state_file):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    val = f.read().strip()
-                    return int(val)
-            except:
-                pass
-        return start_index
-
-    def write_current_index(self, state_file, index):
-        with open(state_file, 'w', encoding='utf-8') as f:
-            f.write(str(index))
-
     def column_letter_to_index(self, column_letter):
         index = 0
         for char in column_letter:
@@ -138,12 +119,8 @@ class RK_CSV_File_State_Looper_v01:
                     chosen_index = random.randint(start_index, end_index)
 
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
 
                 else:
                     chosen_index = start_index
@@ -173,12 +150,8 @@ class RK_CSV_File_State_Looper_v01:
                     chosen_index = random.randint(start_index, end_index)
 
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
 
                 else:
                     chosen_index = start_index
@@ -210,12 +183,8 @@ class RK_CSV_File_State_Looper_v01:
                     chosen_index = random.randint(start_index, end_index)
 
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
 
                 else:
                     chosen_index = start_index
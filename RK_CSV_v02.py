@@ -1,7 +1,10 @@
 import os
 import sys
 import random
-import csv
+from rk_csv_index import CSVRowIndex
+from rk_table_cache import table_cache
+from rk_state_store import state_store, advance_index, read_legacy_index
+from rk_prompt_template import compile_template, column_letter_to_index
 
 class RK_CSV_File_State_Looper_v02: # Renamed class to v02
     @classmethod
@@ -65,32 +68,21 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
     FUNCTION = "read_row"
     CATEGORY = "RK_tools_v02"
 
-    # Cache variables
-    file_data_cache = None
-    file_path_cache = None
-
     def load_file(self, file_path, delimiter):
         """
-        Loads a CSV file into a list of lists and caches it.
+        Opens a CSV file as a memory-mapped, row-indexed table, cached in the shared table cache.
+        Rows are parsed on access, so only the requested row is ever read.
         """
-        if RK_CSV_File_State_Looper_v02.file_path_cache != file_path: # Updated class name
-            if not os.path.isfile(file_path):
-                raise FileNotFoundError(f"File not found: {file_path}")
-
-            _, ext = os.path.splitext(file_path)
-            ext = ext.lower()
-
-            if ext != ".csv":
-                raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
 
-            with open(file_path, "r", encoding="utf-8") as f:
-                reader = csv.reader(f, delimiter=delimiter)
-                data = list(reader)
+        _, ext = os.path.splitext(file_path)
+        ext = ext.lower()
 
-            RK_CSV_File_State_Looper_v02.file_data_cache = data # Updated class name
-            RK_CSV_File_State_Looper_v02.file_path_cache = file_path # Updated class name
+        if ext != ".csv":
+            raise ValueError(f"Unsupported file extension: {ext}. Only .csv is supported.")
 
-        return RK_CSV_File_State_Looper_v02.file_data_cache # Updated class name
+        return table_cache.get(file_path, lambda: CSVRowIndex(file_path, delimiter), kind="row_index", delimiter=delimiter)
 
     def get_row_count(self, data):
         return len(data)
@@ -98,35 +90,17 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
     def get_column_count(self, data):
         if not data:
             return 0
-        return len(data[0]) if data[0] else 0 # Handle empty first row
+        first_row = data[0]
+        return len(first_row) if first_row else 0 # Handle empty first row
 
     def get_state_file_path(self, file_path, start_index, end_index, step_size, loop_mode, orientation, column_name_1="", column_name_2="", column_name_3="", column_name_4="", column_name_5=""): # Added column_name_4 and column_name_5
         base, ext = os.path.splitext(file_path)
         state_file = f"{base}_state_{orientation}_{column_name_1}_{column_name_2}_{column_name_3}_{column_name_4}_{column_name_5}_{loop_mode}_{start_index}_{end_index}_{step_size}.txt" # Added column_name_4 and column_name_5 to state file name
         return state_file
 
-    def read_current_index(self, state_file, start_index):
-        if os.path.isfile(state_file):
-            try:
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    val = f.read().strip()
-                    return int(val)
-            except:
-                pass
-        return start_index
-
-    def write_current_index(self, state_file, index):
-        with open(state_file, 'w', encoding='utf-8') as f:
-            f.write(str(index))
-
     def column_letter_to_index(self, column_letter):
-        index = 0
-        for char in column_letter:
-            if 'A' <= char <= 'Z':
-                index = index * 26 + (ord(char) - ord('A') + 1)
-            else:
-                raise ValueError("Invalid column letter")
-        return index - 1 # Adjust to 0-based index
+        # Shared with the prompt templates; raises ValueError for empty or non-letter names
+        return column_letter_to_index(column_letter)
 
 
     def read_row(self, file_path, orientation, loop_mode, start_index, end_index, step_size, delimiter, column_name_1, column_name_2, column_name_3, column_name_4, column_name_5): # Added column_name_4 and column_name_5 parameter
@@ -156,12 +130,8 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
                 elif loop_mode == "random":
                     chosen_index = random.randint(start_index, end_index)
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
                 else:
                     chosen_index = start_index
 
@@ -197,16 +167,13 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
                 elif loop_mode == "random":
                     chosen_index = random.randint(start_index, end_index)
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
                 else:
                     chosen_index = start_index
 
                 if 0 <= chosen_index < total_cols:
+                    # One streaming pass over the file per run (the row index doesn't keep parsed rows)
                     col_data = [row[chosen_index] if len(row) > chosen_index else "" for row in data]
                     row_text = delimiter.join(map(str, col_data))
                     column_1_text = row_text
@@ -270,38 +237,35 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
                 elif loop_mode == "random":
                     chosen_index = random.randint(start_index, end_index)
                 elif loop_mode == "increment":
-                    current_index = self.read_current_index(state_file, start_index)
-                    chosen_index = current_index
-                    new_index = chosen_index + step_size
-                    if new_index > end_index:
-                        new_index = start_index
-                    self.write_current_index(state_file, new_index)
+                    # Atomic fetch-and-advance, safe with several workers on one sheet
+                    chosen_index = advance_index(state_file, start_index, end_index, step_size)
                 else:
                     chosen_index = start_index
 
                 if 0 <= chosen_index < total_rows:
+                    row_data = data[chosen_index] # Read and parse the row once
                     if total_cols > col_index_1:
-                        column_1_text = str(data[chosen_index][col_index_1])
+                        column_1_text = str(row_data[col_index_1])
                     else:
                         column_1_text = ""
 
                     if total_cols > col_index_2:
-                        column_2_text = str(data[chosen_index][col_index_2])
+                        column_2_text = str(row_data[col_index_2])
                     else:
                         column_2_text = ""
 
                     if total_cols > col_index_3: # Get data for column 3
-                        column_3_text = str(data[chosen_index][col_index_3])
+                        column_3_text = str(row_data[col_index_3])
                     else:
                         column_3_text = ""
 
                     if total_cols > col_index_4: # Get data for column 4
-                        column_4_text = str(data[chosen_index][col_index_4])
+                        column_4_text = str(row_data[col_index_4])
                     else:
                         column_4_text = ""
 
                     if total_cols > col_index_5: # Get data for column 5
-                        column_5_text = str(data[chosen_index][col_index_5])
+                        column_5_text = str(row_data[col_index_5])
                     else:
                         column_5_text = ""
                 else:
@@ -340,12 +304,170 @@ class RK_CSV_File_State_Looper_v02: # Renamed class to v02
             print(f"Error in RK_CSV_File_State_Looper_v02: {str(e)}") # Updated error message to v02
             return ("", "", "", "", "") # Return five empty strings on error
 
+
+class RK_CSV_Batch_Looper_v02(RK_CSV_File_State_Looper_v02):
+    """
+    Batch version of the v02 looper: returns up to batch_size rows per execution as
+    list outputs, so downstream nodes run once per row inside a single queued prompt.
+    Rows are picked from start_index..end_index every step_size rows (a range, or a
+    stride when step_size > 1); "increment" continues where the last batch stopped and
+    "random" draws a sample without replacement.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        inputs["required"]["orientation"] = (["horizontal_row", "specific_columns"],) # A column is already a list
+        inputs["required"]["batch_size"] = ("INT", {
+            "default": 16,
+            "min": 1,
+            "max": 10000,
+            "step": 1
+        })
+        return inputs
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING", "INT",)
+    RETURN_NAMES = ("column_1_text", "column_2_text", "column_3_text", "column_4_text", "column_5_text", "row_index",)
+    OUTPUT_IS_LIST = (True, True, True, True, True, True,)
+    FUNCTION = "read_rows"
+    CATEGORY = "RK_tools_v02"
+
+    def choose_indices(self, state_file, loop_mode, start_index, end_index, step_size, batch_size):
+        candidates = range(start_index, end_index + 1, step_size)
+
+        if loop_mode == "random":
+            return random.sample(candidates, min(batch_size, len(candidates)))
+
+        def batch_from(first):
+            if not start_index <= first <= end_index:
+                first = start_index
+            return list(range(first, end_index + 1, step_size)[:batch_size])
+
+        if loop_mode != "increment":
+            return batch_from(start_index)
+
+        def advance(first):
+            new_index = batch_from(first)[-1] + step_size
+            if new_index > end_index:
+                new_index = start_index
+            return new_index
+
+        # Claim the whole batch atomically, so parallel workers get disjoint batches
+        key = os.path.abspath(state_file)
+        first, _ = state_store.update(key, lambda: read_legacy_index(state_file, start_index), advance)
+        return batch_from(first)
+
+    def read_rows(self, file_path, orientation, loop_mode, start_index, end_index, step_size, delimiter, column_name_1, column_name_2, column_name_3, column_name_4, column_name_5, batch_size):
+        column_names = [column_name_1, column_name_2, column_name_3, column_name_4, column_name_5]
+        try:
+            data = self.load_file(file_path, delimiter)
+            total_rows = self.get_row_count(data)
+            if total_rows == 0:
+                raise ValueError(f"No rows in {file_path}")
+
+            if start_index < 0:
+                start_index = 0
+            if end_index >= total_rows:
+                end_index = total_rows - 1
+            if end_index < start_index:
+                start_index, end_index = end_index, start_index
+
+            col_indices = None
+            if orientation == "specific_columns":
+                col_indices = [self.column_letter_to_index(name.upper()) for name in column_names]
+                if min(col_indices) < 0:
+                    raise ValueError("Column index out of range.")
+
+            state_file = self.get_state_file_path(file_path, start_index, end_index, step_size, loop_mode, f"batch_{orientation}", *column_names)
+            indices = self.choose_indices(state_file, loop_mode, start_index, end_index, step_size, batch_size)
+
+            columns = [[], [], [], [], []]
+            for index in indices:
+                row_data = data[index] # Parse each row once for all five columns
+                if col_indices is None:
+                    texts = [delimiter.join(map(str, row_data)), "", "", "", ""]
+                else:
+                    texts = [str(row_data[c]) if c < len(row_data) else "" for c in col_indices]
+                for column, text in zip(columns, texts):
+                    column.append(text.strip(' "“”'))
+
+            print(f"[DEBUG] Batch Mode: {loop_mode}, Orientation: {orientation}, Rows: {len(indices)} ({indices[0]}..{indices[-1]})")
+
+            return (*columns, indices)
+
+        except Exception as e:
+            print(f"Error in RK_CSV_Batch_Looper_v02: {str(e)}")
+            return ([""], [""], [""], [""], [""], [start_index]) # One empty row on error
+
+
+class RK_CSV_Template_Looper_v02(RK_CSV_Batch_Looper_v02):
+    """
+    Builds prompts straight from CSV rows with one template, e.g.
+    "{col:B|upper} and {col:D}", instead of a chain of column and text nodes.
+    The template is compiled once and cached; each execution renders batch_size
+    rows (picked like the batch looper does) in one pass.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        required = inputs["required"]
+        for name in ("orientation", "column_name_1", "column_name_2", "column_name_3", "column_name_4", "column_name_5", "batch_size"):
+            del required[name]
+        required["template"] = ("STRING", {
+            "default": "{col:B} and {col:D}",
+            "multiline": True
+        })
+        required["batch_size"] = ("INT", {
+            "default": 1,
+            "min": 1,
+            "max": 10000,
+            "step": 1
+        })
+        return inputs
+
+    RETURN_TYPES = ("STRING", "INT",)
+    RETURN_NAMES = ("prompt", "row_index",)
+    OUTPUT_IS_LIST = (True, True,)
+    FUNCTION = "render_rows"
+    CATEGORY = "RK_tools_v02"
+
+    def render_rows(self, file_path, loop_mode, start_index, end_index, step_size, delimiter, template, batch_size):
+        try:
+            compiled = compile_template(template)
+            data = self.load_file(file_path, delimiter)
+            total_rows = self.get_row_count(data)
+            if total_rows == 0:
+                raise ValueError(f"No rows in {file_path}")
+
+            if start_index < 0:
+                start_index = 0
+            if end_index >= total_rows:
+                end_index = total_rows - 1
+            if end_index < start_index:
+                start_index, end_index = end_index, start_index
+
+            state_file = self.get_state_file_path(file_path, start_index, end_index, step_size, loop_mode, "batch_template")
+            indices = self.choose_indices(state_file, loop_mode, start_index, end_index, step_size, batch_size)
+
+            prompts = compiled.render_rows([data[index] for index in indices], indices)
+
+            print(f"[DEBUG] Template Mode: {loop_mode}, Rows: {len(indices)} ({indices[0]}..{indices[-1]}), First prompt: {repr(prompts[0])}")
+
+            return (prompts, indices)
+
+        except Exception as e:
+            print(f"Error in RK_CSV_Template_Looper_v02: {str(e)}")
+            return ([""], [start_index]) # One empty row on error
+
 # Node class mappings
 NODE_CLASS_MAPPINGS = {
-    "RK_CSV_File_State_Looper_v02": RK_CSV_File_State_Looper_v02 # Updated class name in mappings
+    "RK_CSV_File_State_Looper_v02": RK_CSV_File_State_Looper_v02, # Updated class name in mappings
+    "RK_CSV_Batch_Looper_v02": RK_CSV_Batch_Looper_v02,
+    "RK_CSV_Template_Looper_v02": RK_CSV_Template_Looper_v02
 }
 
 # Node display name mappings
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "RK_CSV_File_State_Looper_v02": "📜 RK CSV File State Looper_v02" # Updated display name in mappings
+    "RK_CSV_File_State_Looper_v02": "📜 RK CSV File State Looper_v02", # Updated display name in mappings
+    "RK_CSV_Batch_Looper_v02": "📜 RK CSV Batch Looper_v02",
+    "RK_CSV_Template_Looper_v02": "📜 RK CSV Template Looper_v02"
 }
\ No newline at end of file
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+from rk_table_cache import table_cache
+from rk_state_store import advance_index
+from rk_text_file import TextFile, split_weight
+
+class RK_Line_Sampler:
+    """
+    Picks one line of a (possibly multi-GB) wordlist or prompt file per run,
+    without loading the file: lines are read through a persisted line index
+    (`<file>.rklines.npy`), so every pick is O(1) after the first scan.
+
+    loop_mode, start_index, end_index and step_size work like in the CSV
+    loopers (0-based line numbers). "weighted" draws lines in proportion to
+    an optional "N::" weight prefix (e.g. "3::a red fox"); the prefix is
+    never part of the output.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "file_path": ("STRING", {
+                    "multiline": False,
+                    "default": "path/to/your_file.txt"
+                }),
+                "loop_mode": (["disabled", "random", "weighted", "increment"],),
+                "start_index": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffff,
+                    "step": 1
+                }),
+                "end_index": ("INT", {
+                    "default": 0xffffffffffff,
+                    "min": 0,
+                    "max": 0xffffffffffff,
+                    "step": 1
+                }),
+                "step_size": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 1000,
+                    "step": 1
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "INT", "INT",)
+    RETURN_NAMES = ("line_text", "line_index", "line_count",)
+    FUNCTION = "sample_line"
+    CATEGORY = "RK_tools_v02"
+
+    @classmethod
+    def IS_CHANGED(cls, loop_mode="disabled", **kwargs):
+        # Every run picks a new line unless the loop is disabled
+        if loop_mode != "disabled":
+            return float("nan")
+        return ""
+
+    def load_file(self, file_path):
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        return table_cache.get(file_path, lambda: TextFile(file_path, index_lines=True), kind="text_lines")
+
+    def get_state_file_path(self, file_path, start_index, end_index, step_size, loop_mode):
+        base, ext = os.path.splitext(file_path)
+        return f"{base}_state_lines_{loop_mode}_{start_index}_{end_index}_{step_size}.txt"
+
+    def sample_line(self, file_path, loop_mode, start_index, end_index, step_size):
+        try:
+            text_file = self.load_file(file_path)
+            total_lines = text_file.line_count
+            if total_lines == 0:
+                raise ValueError(f"No lines in {file_path}")
+
+            if start_index < 0:
+                start_index = 0
+            if end_index >= total_lines:
+                end_index = total_lines - 1
+            if start_index >= total_lines:
+                start_index = total_lines - 1
+            if end_index < start_index:
+                start_index, end_index = end_index, start_index
+
+            if loop_mode == "random":
+                chosen_index = random.randint(start_index, end_index)
+            elif loop_mode == "weighted":
+                chosen_index = text_file.weighted_index(start_index, end_index)
+            elif loop_mode == "increment":
+                # Atomic fetch-and-advance, safe with several workers on one file
+                state_file = self.get_state_file_path(file_path, start_index, end_index, step_size, loop_mode)
+                chosen_index = advance_index(state_file, start_index, end_index, step_size)
+                if not start_index <= chosen_index <= end_index:
+                    chosen_index = start_index
+            else:
+                chosen_index = start_index
+
+            _, line_text = split_weight(text_file.line(chosen_index))
+            line_text = line_text.strip()
+
+            print(f"[DEBUG] Line Sampler Mode: {loop_mode}, Line: {chosen_index}/{total_lines}, Text: {repr(line_text[:80])}")
+
+            return (line_text, chosen_index, total_lines)
+
+        except Exception as e:
+            print(f"Error in RK_Line_Sampler: {str(e)}")
+            return ("", start_index, 0)
+
+# Node class mappings
+NODE_CLASS_MAPPINGS = {
+    "RK_Line_Sampler": RK_Line_Sampler
+}
+
+# Node display name mappings
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "RK_Line_Sampler": "📜 RK Line Sampler"
+}
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
-import pandas as pd
+from rk_table_cache import table_cache
+from rk_excel_snapshot import ExcelSnapshot
 
 class RK_Read_Excel_Row:
     @classmethod
@@ -21,6 +22,12 @@ class RK_Read_Excel_Row:
                     "default": " ",
                     "multiline": False
                 })
+            },
+            "optional": {
+                "sheet_name": ("STRING", {
+                    "default": "",
+                    "multiline": False
+                })
             }
         }
 
@@ -29,21 +36,22 @@ class RK_Read_Excel_Row:
     FUNCTION = "read_excel_row"
     CATEGORY = "RK_tools_v02"
 
-    def read_excel_row(self, file_path, row_index, delimiter):
+    def read_excel_row(self, file_path, row_index, delimiter, sheet_name=""):
         try:
             # Check if file exists
             if not os.path.isfile(file_path):
                 raise FileNotFoundError(f"Excel file not found: {file_path}")
 
-            # Read the Excel file using pandas
-            df = pd.read_excel(file_path, header=None)  # No header, treat all rows as data
-            
+            # Open the sheet's columnar snapshot (converted from the workbook once, cached until it changes)
+            sheet = sheet_name.strip() or 0  # Empty means the first sheet
+            rows = table_cache.get(file_path, lambda: ExcelSnapshot(file_path, sheet), kind="snapshot", sheet=sheet)
+
             # Check if row_index is within range
-            if row_index < 0 or row_index >= len(df):
-                raise IndexError(f"Row index {row_index} is out of range. File has {len(df)} rows.")
+            if row_index < 0 or row_index >= len(rows):
+                raise IndexError(f"Row index {row_index} is out of range. File has {len(rows)} rows.")
 
             # Extract the row data
-            row_data = df.iloc[row_index].tolist()
+            row_data = rows[row_index]
 
             # Convert all values to strings and join them
             row_text = delimiter.join(map(str, row_data))
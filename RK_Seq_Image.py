@@ -1,19 +1,93 @@
 # -*- coding: utf-8 -*-
 import os
-import glob
 import random
 import logging
 from PIL import Image
 import numpy as np
 import torch
+from rk_state_store import state_store, read_legacy_index
+from rk_dir_index import get_directory_index
+from rk_prefetch import Prefetcher
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# File to store the current index
+# Single shared index file used by earlier versions; now only read to seed the state store
 STATE_FILE = os.path.join(os.path.dirname(__file__), "rk_image_viewer_state.txt")
 
+# Decodes upcoming images in the background (bounded by RK_PREFETCH_MB)
+prefetcher = Prefetcher()
+
+
+def images_to_tensor(images, pin_memory=False):
+    """
+    Converts same-sized RGB PIL images to an [N,H,W,3] float32 tensor in [0, 1].
+    The uint8 pixels are scaled in a single pass straight into the tensor's
+    memory, instead of building two full-size float arrays first.
+    """
+    width, height = images[0].size
+    pin_memory = pin_memory and torch.cuda.is_available()
+    image_tensor = torch.empty((len(images), height, width, 3), dtype=torch.float32, pin_memory=pin_memory)
+    out = image_tensor.numpy()
+    for i, image in enumerate(images):
+        pixels = np.asarray(image)  # uint8 HxWx3, the only temporary
+        # Divide (not multiply by 1/255) so values are bit-identical to astype(float32) / 255.0
+        np.divide(pixels, np.float32(255.0), out=out[i], casting="unsafe")
+    return image_tensor
+
+
+def image_to_tensor(image, pin_memory=False):
+    """Converts an RGB PIL image to a [1,H,W,3] float32 tensor in [0, 1]."""
+    return images_to_tensor([image], pin_memory)
+
+
+def load_image(image_path, max_size=0):
+    """Opens and decodes an image as RGB."""
+    image = Image.open(image_path)
+    if max_size > 0:
+        # Before decoding: JPEGs are decoded at a reduced scale (draft), then resampled
+        # so the longest side is at most max_size
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    else:
+        image.load()
+    return image
+
+
+def fit_image(image, size, size_mode):
+    """Brings an image to `size`: stretched ("resize") or shrunk to fit and centered on black ("pad")."""
+    if image.size == size:
+        return image
+    if size_mode == "pad":
+        if image.width > size[0] or image.height > size[1]:
+            image = image.copy()
+            image.thumbnail(size, Image.LANCZOS)
+        canvas = Image.new('RGB', size, color='black')
+        canvas.paste(image, ((size[0] - image.width) // 2, (size[1] - image.height) // 2))
+        return canvas
+    return image.resize(size, Image.LANCZOS)
+
+
+def load_prompt_text(image_path, show_text):
+    """Reads the image's sidecar .txt prompt, if enabled."""
+    prompt_text = ""
+    if show_text == "enabled":
+        text_path = os.path.splitext(image_path)[0] + ".txt"
+        if os.path.exists(text_path):
+            with open(text_path, "r", encoding="utf-8", errors='replace') as f:
+                prompt_text = f.read().strip()
+        else:
+            prompt_text = "No text file found"
+    return prompt_text
+
+
+def load_image_and_text(image_path, show_text, max_size=0, pin_memory=False):
+    """Decodes an image into a [1,H,W,3] float tensor and reads its sidecar .txt prompt."""
+    image_tensor = image_to_tensor(load_image(image_path, max_size), pin_memory)
+    return image_tensor, load_prompt_text(image_path, show_text)
+
 # ===========================================
 # RK Image Viewer Node (Position Input + File-Based Persistent State)
 # ===========================================
@@ -39,6 +113,24 @@ class RK_ImageViewer:
                     "step": 1,
                     "display": "number"
                 }),
+            },
+            "optional": {
+                # How many of the next images (in increment/decrement mode) to decode ahead of time
+                "prefetch_count": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 32,
+                    "step": 1
+                }),
+                # Longest side to decode at (0 = full resolution); JPEGs use a fast reduced-size decode
+                "max_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                # Page-locked output for faster host-to-GPU copies (ignored without CUDA)
+                "pin_memory": ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -48,7 +140,7 @@ class RK_ImageViewer:
     CATEGORY = "RK_tools_v02"
     OUTPUT_NODE = True
 
-    def load_image_text(self, directory, mode, show_text, position):
+    def load_image_text(self, directory, mode, show_text, position, prefetch_count=2, max_size=0, pin_memory=False):
         try:
             # Validate directory
             if not os.path.isdir(directory):
@@ -56,41 +148,32 @@ class RK_ImageViewer:
                 logger.error(error_msg)
                 return (torch.zeros(1, 64, 64, 3), error_msg, "", "0/0")
 
-            # Get all supported image formats
-            image_formats = ["*.png", "*.jpg", "*.jpeg", "*.webp"]
-            image_files = []
-            for fmt in image_formats:
-                image_files.extend(glob.glob(os.path.join(directory, fmt)))
-            
-            # Sort files alphabetically
-            image_files = sorted(image_files)
-            
+            # Sorted png/jpg/jpeg/webp files, from the cached index (rescanned only when the folder changes)
+            image_files = get_directory_index(directory)
+
             if not image_files:
                 return (torch.zeros(1, 64, 64, 3), "No images found", "", "0/0")
 
-            # Load or initialize the current index
-            if os.path.exists(STATE_FILE):
-                with open(STATE_FILE, "r") as f:
-                    current_index = int(f.read().strip())
-            else:
-                current_index = 0
-
             # Handle mode selection
-            if mode == "increment":
-                current_index = (current_index + 1) % len(image_files)
-            elif mode == "decrement":
-                current_index = (current_index - 1) % len(image_files)
-            elif mode == "random":
-                current_index = random.randint(0, len(image_files) - 1)
-            elif mode == "position":
-                # Use the provided position (1-based index)
-                current_index = (position - 1) % len(image_files)
-            elif mode == "disabled":
-                pass  # Keep current index unchanged
-
-            # Save the current index to the state file
-            with open(STATE_FILE, "w") as f:
-                f.write(str(current_index))
+            def advance(current_index):
+                if mode == "increment":
+                    current_index = (current_index + 1) % len(image_files)
+                elif mode == "decrement":
+                    current_index = (current_index - 1) % len(image_files)
+                elif mode == "random":
+                    current_index = random.randint(0, len(image_files) - 1)
+                elif mode == "position":
+                    # Use the provided position (1-based index)
+                    current_index = (position - 1) % len(image_files)
+                elif mode == "disabled":
+                    pass  # Keep current index unchanged
+                return current_index
+
+            # Load, update and save the index for this directory in one atomic step
+            state_key = f"RK_ImageViewer:{os.path.abspath(directory)}"
+            _, current_index = state_store.update(state_key, lambda: read_legacy_index(STATE_FILE, 0), advance)
+            # The file list may have shrunk since the index was stored
+            current_index %= len(image_files)
 
             # Get the current image path
             image_path = image_files[current_index]
@@ -99,23 +182,20 @@ class RK_ImageViewer:
             file_name = os.path.splitext(os.path.basename(image_path))[0]
             logger.info(f"Loading image {current_index + 1}/{len(image_files)}: {file_name}")
 
-            # Load image
-            image = Image.open(image_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-                
-            image_array = np.array(image).astype(np.float32) / 255.0
-            image_tensor = torch.from_numpy(image_array)[None,]
-
-            # Load text file if enabled
-            prompt_text = ""
-            if show_text == "enabled":
-                text_path = os.path.join(directory, f"{file_name}.txt")
-                if os.path.exists(text_path):
-                    with open(text_path, "r", encoding="utf-8", errors='replace') as f:
-                        prompt_text = f.read().strip()
-                else:
-                    prompt_text = "No text file found"
+            # Load image and prompt (already decoded if it was prefetched)
+            load_args = (image_path, show_text, max_size, pin_memory)
+            image_tensor, prompt_text = prefetcher.get(load_args, load_image_and_text, *load_args)
+
+            # The next images are predictable in increment/decrement mode: decode them now
+            upcoming = []
+            if mode in ("increment", "decrement") and prefetch_count > 0:
+                direction = 1 if mode == "increment" else -1
+                for offset in range(1, min(prefetch_count, len(image_files) - 1) + 1):
+                    upcoming.append((image_files[(current_index + direction * offset) % len(image_files)], show_text, max_size, pin_memory))
+            # Scoped to this directory's viewer, so other viewers keep their prefetches
+            prefetcher.retain(upcoming, owner=state_key)
+            for key in upcoming:
+                prefetcher.prefetch(key, load_image_and_text, *key, owner=state_key)
 
             # Prepare image count string
             image_count = f"{current_index + 1}/{len(image_files)}"
@@ -126,13 +206,127 @@ class RK_ImageViewer:
             logger.error(f"Error in RK_ImageViewer: {str(e)}")
             return (torch.zeros(1, 64, 64, 3), f"Error: {str(e)}", "", "0/0")
 
+
+# ===========================================
+# RK Image Viewer Batch Node (N images per execution)
+# ===========================================
+class RK_ImageViewer_Batch:
+    """
+    Loads batch_size images per execution on worker threads and returns them as
+    one [N,H,W,3] batch (sized like the first image), with the prompt texts and
+    file names as lists. increment/decrement move a whole batch per run.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "directory": ("STRING", {
+                    "default": "C:/Users/TS6000-1/Downloads/Art02/Art02/Art02",
+                    "multiline": False
+                }),
+                "mode": (["increment", "decrement", "random", "disabled", "position"], {
+                    "default": "increment"
+                }),
+                "show_text": (["enabled", "disabled"], {
+                    "default": "enabled"
+                }),
+                "position": ("INT", {
+                    "default": 1,
+                    "min": 1,
+                    "max": 1000,
+                    "step": 1,
+                    "display": "number"
+                }),
+                "batch_size": ("INT", {
+                    "default": 8,
+                    "min": 1,
+                    "max": 1024,
+                    "step": 1
+                }),
+                "size_mode": (["resize", "pad"], {
+                    "default": "resize"
+                }),
+            },
+            "optional": {
+                "max_size": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 16384,
+                    "step": 8
+                }),
+                "pin_memory": ("BOOLEAN", {"default": False}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("IMAGE", "PROMPT_TEXT", "FILE_NAME", "IMAGE_COUNT")
+    OUTPUT_IS_LIST = (False, True, True, False)
+    FUNCTION = "load_batch"
+    CATEGORY = "RK_tools_v02"
+    OUTPUT_NODE = True
+
+    def choose_indices(self, directory, mode, position, count, total):
+        if mode == "random":
+            return random.sample(range(total), count)
+
+        direction = -1 if mode == "decrement" else 1
+
+        def advance(first):
+            if mode == "position":
+                first = position - 1
+            if mode in ("increment", "decrement"):
+                return (first + direction * count) % total
+            return first
+
+        # The stored index is where the next batch starts
+        state_key = f"RK_ImageViewer_Batch:{os.path.abspath(directory)}"
+        first, new_first = state_store.update(state_key, 0, advance)
+        if mode == "position":
+            first = new_first
+        return [(first + direction * k) % total for k in range(count)]
+
+    def load_batch(self, directory, mode, show_text, position, batch_size, size_mode, max_size=0, pin_memory=False):
+        try:
+            if not os.path.isdir(directory):
+                error_msg = f"Directory not found: {directory}"
+                logger.error(error_msg)
+                return (torch.zeros(1, 64, 64, 3), [error_msg], [""], "0/0")
+
+            image_files = get_directory_index(directory)
+            if not image_files:
+                return (torch.zeros(1, 64, 64, 3), ["No images found"], [""], "0/0")
+
+            total = len(image_files)
+            indices = self.choose_indices(directory, mode, position, min(batch_size, total), total)
+            image_paths = [image_files[i] for i in indices]
+            file_names = [os.path.splitext(os.path.basename(path))[0] for path in image_paths]
+            logger.info(f"Loading {len(image_paths)} images starting at {indices[0] + 1}/{total}")
+
+            # Decode in parallel on the shared prefetch pool
+            images = list(prefetcher.executor.map(lambda path: load_image(path, max_size), image_paths))
+            prompt_texts = [load_prompt_text(path, show_text) for path in image_paths]
+
+            size = images[0].size
+            images = [fit_image(image, size, size_mode) for image in images]
+            image_tensor = images_to_tensor(images, pin_memory)
+
+            image_count = f"{indices[0] + 1}-{indices[-1] + 1}/{total}"
+
+            return (image_tensor, prompt_texts, file_names, image_count)
+
+        except Exception as e:
+            logger.error(f"Error in RK_ImageViewer_Batch: {str(e)}")
+            return (torch.zeros(1, 64, 64, 3), [f"Error: {str(e)}"], [""], "0/0")
+
 # ===========================================
 # Node Registration
 # ===========================================
 NODE_CLASS_MAPPINGS = {
-    "RK_ImageViewer": RK_ImageViewer
+    "RK_ImageViewer": RK_ImageViewer,
+    "RK_ImageViewer_Batch": RK_ImageViewer_Batch
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "RK_ImageViewer": "🖼️ RK Sequential Image Viewer"
+    "RK_ImageViewer": "🖼️ RK Sequential Image Viewer",
+    "RK_ImageViewer_Batch": "🖼️ RK Sequential Image Viewer (Batch)"
 }
\ No newline at end of file
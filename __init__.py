@@ -1,5 +1,9 @@
 import os
 import sys
+import re
+import copy
+import json
+import hashlib
 import importlib.util
 
 NODE_CLASS_MAPPINGS = {}
@@ -12,30 +16,272 @@ custom_node_dir = os.path.dirname(__file__)
 if custom_node_dir not in sys.path:
     sys.path.append(custom_node_dir)
 
-# Walk through all files in the custom node directory
-for filename in os.listdir(custom_node_dir):
-    filepath = os.path.join(custom_node_dir, filename)
+# Lazy discovery: set RK_COMFYUI_LAZY_NODES=1 to register lightweight proxies from a
+# cached manifest and only import a node's module (torch, pandas, ...) when it first runs.
+LAZY_NODES = os.environ.get("RK_COMFYUI_LAZY_NODES", "0").strip().lower() in ("1", "true", "yes", "on")
+MANIFEST_FILE = os.path.join(custom_node_dir, ".rk_node_manifest.json")
+MANIFEST_VERSION = 2
 
-    # Skip __init__.py and non-Python files
-    if filename == "__init__.py" or not filename.endswith(".py"):
-        continue
+# Methods ComfyUI looks up on the node class itself; proxies forward them to the real class.
+PROXY_CLASS_METHODS = ("IS_CHANGED", "VALIDATE_INPUTS")
 
-    try:
+# Files without a top-level NODE_CLASS_MAPPINGS are helpers (rk_table_cache, ...); the
+# node modules import those themselves, so the loader never executes them.
+NODE_MAPPINGS_PATTERN = re.compile(rb"^NODE_CLASS_MAPPINGS\s*=", re.MULTILINE)
+
+# Modules imported so far, keyed on file name, so proxies and the eager path share one copy.
+_loaded_modules = {}
+
+
+def load_node_module(filename):
+    """Import (once) and return the node module stored in `filename`."""
+    module = _loaded_modules.get(filename)
+    if module is None:
+        filepath = os.path.join(custom_node_dir, filename)
         module_name = os.path.splitext(filename)[0]
         spec = importlib.util.spec_from_file_location(module_name, filepath)
         module = importlib.util.module_from_spec(spec)
         spec.loader.exec_module(module)
+        _loaded_modules[filename] = module
+    return module
+
+
+def file_sha256(filepath):
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def defines_nodes(filepath):
+    with open(filepath, "rb") as f:
+        return NODE_MAPPINGS_PATTERN.search(f.read()) is not None
+
+
+def package_signature(filenames):
+    """Name, size and mtime of every package file; cheap to compare on each startup."""
+    signature = []
+    for filename in filenames:
+        stat = os.stat(os.path.join(custom_node_dir, filename))
+        signature.append([filename, stat.st_size, stat.st_mtime])
+    return signature
+
+
+def package_sha256(filenames):
+    """One hash over the names and contents of every package file."""
+    h = hashlib.sha256()
+    for filename in filenames:
+        h.update(filename.encode("utf-8") + b"\0")
+        h.update(file_sha256(os.path.join(custom_node_dir, filename)).encode("ascii"))
+    return h.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "signature": None, "sha256": None, "files": {}}
+
+
+def save_manifest(manifest):
+    # Write to a temp file and swap it in so a crash never leaves half a manifest behind
+    tmp_path = f"{MANIFEST_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, MANIFEST_FILE)
+    except OSError as e:
+        print(f"❌ Could not write node manifest {MANIFEST_FILE}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def describe_node(node_class):
+    """
+    Captures everything ComfyUI reads from a node class before executing it:
+    INPUT_TYPES() and the upper-case class attributes (RETURN_TYPES, FUNCTION, ...).
+    Raises TypeError/ValueError if the description is not JSON-serializable.
+    """
+    attributes = {}
+    for attr in dir(node_class):
+        if not attr.isupper() or attr.startswith("_") or attr == "INPUT_TYPES":
+            continue
+        value = getattr(node_class, attr)
+        if not callable(value):
+            attributes[attr] = value
+
+    description = {
+        "input_types": node_class.INPUT_TYPES(),
+        "attributes": attributes,
+        "class_methods": [m for m in PROXY_CLASS_METHODS if hasattr(node_class, m)],
+    }
+    json.dumps(description)
+    return description
+
+
+def describe_module(module):
+    """Builds the manifest entry for an imported module, or None if it can't be proxied."""
+    if not getattr(module, "RK_LAZY_LOAD", True):
+        return None
+    nodes = {}
+    for node_name, node_class in getattr(module, "NODE_CLASS_MAPPINGS", {}).items():
+        try:
+            nodes[node_name] = describe_node(node_class)
+        except Exception:
+            return None
+    return {
+        "nodes": nodes,
+        "display_names": dict(getattr(module, "NODE_DISPLAY_NAME_MAPPINGS", {})),
+    }
+
+
+def restore_input_types(input_types):
+    # JSON turns the ("TYPE", {options}) tuples into lists; ComfyUI expects tuples there
+    return {
+        section: {name: tuple(spec) if isinstance(spec, list) else spec for name, spec in inputs.items()}
+        if isinstance(inputs, dict) else inputs
+        for section, inputs in input_types.items()
+    }
+
+
+def restore_attribute(name, value):
+    if isinstance(value, list) and name.startswith(("RETURN_", "OUTPUT_")):
+        return tuple(value)
+    return value
+
+
+def make_proxy_class(node_name, filename, description):
+    """
+    Creates a stand-in class that answers ComfyUI's metadata queries from the manifest
+    and imports the real module the first time the node is instantiated or validated.
+    """
+    input_types = restore_input_types(description["input_types"])
+
+    def real_class(cls):
+        return load_node_module(filename).NODE_CLASS_MAPPINGS[node_name]
+
+    def INPUT_TYPES(cls):
+        return copy.deepcopy(input_types)
+
+    def __init__(self):
+        object.__setattr__(self, "_rk_instance", None)
+
+    def __getattr__(self, name):
+        if name.startswith("_rk_"):
+            raise AttributeError(name)
+        if self._rk_instance is None:
+            object.__setattr__(self, "_rk_instance", type(self).real_class()())
+        return getattr(self._rk_instance, name)
+
+    namespace = {
+        "__init__": __init__,
+        "__getattr__": __getattr__,
+        "__module__": os.path.splitext(filename)[0],
+        "real_class": classmethod(real_class),
+        "INPUT_TYPES": classmethod(INPUT_TYPES),
+    }
+    for attr, value in description["attributes"].items():
+        namespace[attr] = restore_attribute(attr, value)
+
+    for method_name in description["class_methods"]:
+        def forward(cls, *args, _method_name=method_name, **kwargs):
+            return getattr(cls.real_class(), _method_name)(*args, **kwargs)
+        namespace[method_name] = classmethod(forward)
+
+    return type(node_name, (object,), namespace)
+
+
+def register_module(module):
+    if hasattr(module, "NODE_CLASS_MAPPINGS"):
+        NODE_CLASS_MAPPINGS.update(module.NODE_CLASS_MAPPINGS)
+    if hasattr(module, "NODE_DISPLAY_NAME_MAPPINGS"):
+        NODE_DISPLAY_NAME_MAPPINGS.update(module.NODE_DISPLAY_NAME_MAPPINGS)
+
+
+def register_manifest_entry(filename, entry):
+    for node_name, description in entry["nodes"].items():
+        NODE_CLASS_MAPPINGS[node_name] = make_proxy_class(node_name, filename, description)
+    NODE_DISPLAY_NAME_MAPPINGS.update(entry["display_names"])
+
+
+def manifest_is_fresh(manifest, filenames):
+    """
+    The cached descriptions depend on helper modules too (e.g. SAVE_PROFILES in
+    rk_save_utils feeds INPUT_TYPES), so the manifest is only reused while no
+    package file changed. Size and mtime are compared first; if only mtimes moved
+    (touch, checkout) but the combined content hash matches, the signature is
+    updated and the manifest is kept.
+    """
+    signature = package_signature(filenames)
+    if manifest["signature"] == signature:
+        return True
+    if manifest["sha256"] == package_sha256(filenames):
+        manifest["signature"] = signature
+        return True
+    return False
+
+
+package_files = sorted(filename for filename in os.listdir(custom_node_dir) if filename.endswith(".py"))
+source_files = [
+    filename for filename in package_files
+    # Skip __init__.py and helper modules
+    if filename != "__init__.py" and defines_nodes(os.path.join(custom_node_dir, filename))
+]
+
+manifest_dirty = False
+manifest = None
+if LAZY_NODES:
+    manifest = load_manifest()
+    signature_before = manifest["signature"]
+    if manifest_is_fresh(manifest, package_files):
+        manifest_dirty = manifest["signature"] != signature_before
+    else:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "signature": package_signature(package_files),
+            "sha256": package_sha256(package_files),
+            "files": {},
+        }
+        manifest_dirty = True
+
+# Walk through all files in the custom node directory
+for filename in source_files:
+    module_name = os.path.splitext(filename)[0]
+
+    try:
+        entry = manifest["files"].get(filename) if LAZY_NODES else None
+        if entry is not None and entry["nodes"] is not None:
+            register_manifest_entry(filename, entry)
+            print(f"✔ Indexed node module (lazy): {module_name}")
+            continue
+
+        module = load_node_module(filename)
 
         # Collect mappings if present
-        if hasattr(module, "NODE_CLASS_MAPPINGS"):
-            NODE_CLASS_MAPPINGS.update(module.NODE_CLASS_MAPPINGS)
-        if hasattr(module, "NODE_DISPLAY_NAME_MAPPINGS"):
-            NODE_DISPLAY_NAME_MAPPINGS.update(module.NODE_DISPLAY_NAME_MAPPINGS)
+        register_module(module)
+
+        if LAZY_NODES and entry is None:
+            described = describe_module(module)
+            manifest["files"][filename] = {
+                # None means "always import eagerly" (dynamic INPUT_TYPES, opted out, ...)
+                "nodes": described and described["nodes"],
+                "display_names": described["display_names"] if described else {},
+            }
+            manifest_dirty = True
 
         print(f"✔ Loaded node module: {module_name}")
     except Exception as e:
         print(f"❌ Failed to load module {filename}: {e}")
 
+# Deleted or renamed files change the package signature, so no stale entries survive
+if LAZY_NODES and manifest_dirty:
+    save_manifest(manifest)
+
 print(f"✅ RK_Comfyui loaded with {len(NODE_CLASS_MAPPINGS)} nodes")
 
 __all__ = ["NODE_CLASS_MAPPINGS", "NODE_DISPLAY_NAME_MAPPINGS"]
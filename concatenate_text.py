@@ -1,5 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
+from rk_table_cache import table_cache
+from rk_text_file import TextFile
+
+
+def has_text(text):
+    # Same as bool(text.strip()), without copying a large file's text
+    return bool(text) and not text.isspace()
+
+
+def load_whole_file(file_path):
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
 
 class RK_Concatenate_Text:
     @classmethod
@@ -30,6 +43,29 @@ class RK_Concatenate_Text:
                     "default": "",
                     "multiline": False
                 })
+            },
+            "optional": {
+                # whole: the full file (cached until it changes); the others read only part of it, memory-mapped
+                "file_read_mode": (["whole", "byte_range", "first_lines", "random_line"], {"default": "whole"}),
+                "range_start": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffff,
+                    "step": 1
+                }),
+                # 0 = end of file
+                "range_end": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffff,
+                    "step": 1
+                }),
+                "line_count": ("INT", {
+                    "default": 10,
+                    "min": 1,
+                    "max": 1000000,
+                    "step": 1
+                }),
             }
         }
     
@@ -38,41 +74,50 @@ class RK_Concatenate_Text:
     FUNCTION = "concatenate_text"
     CATEGORY = "RK_tools_v02"
 
-    def concatenate_text(self, input_text_1, input_text_2, concatenation_mode, prefix, suffix, load_from_file, file_path):
+    @classmethod
+    def IS_CHANGED(cls, load_from_file="no", file_read_mode="whole", **kwargs):
+        # A random line has to be drawn again on every run
+        if load_from_file == "yes" and file_read_mode == "random_line":
+            return float("nan")
+        return ""
+
+    def read_file(self, file_path, file_read_mode, range_start, range_end, line_count):
+        if file_read_mode == "whole":
+            return table_cache.get(file_path, lambda: load_whole_file(file_path), kind="text")
+        if file_read_mode == "random_line":
+            text_file = table_cache.get(file_path, lambda: TextFile(file_path, index_lines=True), kind="text_lines")
+            return text_file.random_line()
+        text_file = table_cache.get(file_path, lambda: TextFile(file_path), kind="text_mmap")
+        if file_read_mode == "first_lines":
+            return text_file.first_lines(line_count)
+        return text_file.read_range(range_start, range_end)
+
+    def concatenate_text(self, input_text_1, input_text_2, concatenation_mode, prefix, suffix, load_from_file, file_path, file_read_mode="whole", range_start=0, range_end=0, line_count=10):
         try:
             # Optionally load text from file
             file_text = ""
             if load_from_file == "yes" and file_path.strip():
                 if os.path.exists(file_path) and os.path.isfile(file_path):
-                    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                        file_text = f.read()
+                    file_text = self.read_file(file_path, file_read_mode, range_start, range_end, line_count)
                 else:
                     print(f"Warning: The file path '{file_path}' does not exist or is not a file.")
 
-            # Determine the concatenation approach
-            if concatenation_mode == "append":
-                # input_text_1 + input_text_2 + file_text
-                combined_text = input_text_1 + input_text_2 + file_text
-            elif concatenation_mode == "prepend":
+            # Determine the concatenation approach; the result (with prefix and suffix) is built in one join
+            if concatenation_mode == "prepend":
                 # file_text + input_text_1 + input_text_2
-                combined_text = file_text + input_text_1 + input_text_2
+                parts = [prefix, file_text, input_text_1, input_text_2, suffix]
             elif concatenation_mode == "join_with_space":
                 # Join non-empty texts with a space
-                segments = [t for t in [input_text_1, input_text_2, file_text] if t.strip()]
-                combined_text = " ".join(segments)
+                segments = [t for t in [input_text_1, input_text_2, file_text] if has_text(t)]
+                parts = [prefix, " ".join(segments), suffix]
             elif concatenation_mode == "join_with_newline":
                 # Join non-empty texts with a newline
-                segments = [t for t in [input_text_1, input_text_2, file_text] if t.strip()]
-                combined_text = "\n".join(segments)
+                segments = [t for t in [input_text_1, input_text_2, file_text] if has_text(t)]
+                parts = [prefix, "\n".join(segments), suffix]
             else:
-                # Default to just appending if somehow invalid mode is chosen
-                combined_text = input_text_1 + input_text_2 + file_text
-
-            # Add prefix and suffix
-            if prefix:
-                combined_text = prefix + combined_text
-            if suffix:
-                combined_text = combined_text + suffix
+                # append (also the default if somehow invalid mode is chosen): input_text_1 + input_text_2 + file_text
+                parts = [prefix, input_text_1, input_text_2, file_text, suffix]
+            combined_text = "".join(parts)
 
             return input_text_1, input_text_2, combined_text
 
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import os
+import io
+import re
+import sys
+import csv
+import mmap
+import struct
+from array import array
+
+# Sidecar layout: 32-byte header followed by (row_count + 1) native uint64 row start offsets
+INDEX_SUFFIX = ".rkidx"
+# Version 2: rows found with a CSV state machine (version 1 indexes may have merged rows)
+INDEX_MAGIC = b"RKIDX2" + (b"L" if sys.byteorder == "little" else b"B") + b"\0"
+INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, file size, file mtime_ns, row count
+
+
+QUOTE = b'"'
+# Bytes that can change the scanner's state outside a quoted field
+SPECIAL_BYTES = re.compile(rb'[\r\n"]')
+
+
+def scan_rows(mm, size, delimiter, offsets):
+    """Appends the end offset of every row in `mm` to `offsets` (see CSVRowIndex._build_index)."""
+    row_start = pos = 0
+    while pos < size:
+        match = SPECIAL_BYTES.search(mm, pos)
+        if match is None:
+            break
+        pos = match.start()
+        byte = mm[pos:pos + 1]
+
+        if byte == QUOTE:
+            at_field_start = pos == row_start or mm[pos - len(delimiter):pos] == delimiter
+            if not at_field_start:
+                # A quote inside an unquoted field is a literal character
+                pos += 1
+                continue
+            # Skip to the closing quote; "" is an escaped quote
+            pos += 1
+            while True:
+                quote = mm.find(QUOTE, pos)
+                if quote == -1:
+                    return  # Unterminated quote: the rest of the file is one row
+                if mm[quote + 1:quote + 2] == QUOTE:
+                    pos = quote + 2
+                    continue
+                pos = quote + 1
+                break
+            continue
+
+        # End of row: "\n", "\r\n" or a bare "\r"
+        pos += 1
+        if byte == b"\r" and mm[pos:pos + 1] == b"\n":
+            pos += 1
+        offsets.append(pos)
+        row_start = pos
+
+
+class CSVRowIndex:
+    """
+    Read-only, list-like view of a CSV file: len(), [i] and iteration return rows
+    exactly as csv.reader would, but only the requested row is ever parsed.
+
+    A quote-aware table of row start offsets is built once (from a temporary
+    memory mapping), then persisted next to the file (`<file>.rkidx`) keyed on
+    its size and mtime, so later processes open it without rescanning.
+
+    No handle on the CSV stays open between calls: each row is read with its
+    own short open/seek/read, so the sheet can still be saved over (Windows
+    refuses to replace a file that is open or mapped).
+    """
+
+    def __init__(self, file_path, delimiter=","):
+        self.file_path = file_path
+        self.delimiter = delimiter
+        stat = os.stat(file_path)
+        self.file_size = stat.st_size
+        self.file_mtime_ns = stat.st_mtime_ns
+        self._offsets = self._load_index() or self._build_index()
+
+    @property
+    def index_path(self):
+        return self.file_path + INDEX_SUFFIX
+
+    @property
+    def nbytes(self):
+        """Resident size of the index itself (rows are read from disk on demand)."""
+        return len(self._offsets) * 8
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                header = f.read(INDEX_HEADER.size)
+                if len(header) != INDEX_HEADER.size:
+                    return None
+                magic, size, mtime_ns, count = INDEX_HEADER.unpack(header)
+                if (magic, size, mtime_ns) != (INDEX_MAGIC, self.file_size, self.file_mtime_ns):
+                    return None
+                if os.fstat(f.fileno()).st_size != INDEX_HEADER.size + (count + 1) * 8:
+                    return None
+                offsets = array("Q")
+                offsets.fromfile(f, count + 1)
+        except (OSError, ValueError, EOFError):
+            return None
+        return offsets
+
+    def _build_index(self):
+        """
+        Finds row boundaries the way csv.reader does: a quote only starts a
+        quoted field at the start of a field (line start or right after the
+        delimiter), "" inside a quoted field is an escaped quote, and outside
+        quotes "\n", "\r\n" and a bare "\r" each end a row.
+        """
+        offsets = array("Q", [0])
+        if self.file_size:
+            with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                scan_rows(mm, self.file_size, self.delimiter.encode("utf-8"), offsets)
+        if offsets[-1] != self.file_size:
+            # Unterminated quote at EOF: csv.reader still returns the remainder as one row
+            offsets.append(self.file_size)
+
+        self._save_index(offsets)
+        return offsets
+
+    def _save_index(self, offsets):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.file_size, self.file_mtime_ns, len(offsets) - 1))
+                offsets.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # Read-only data folder: keep the in-memory index and rebuild next time
+            print(f"[DEBUG] Could not write CSV index {self.index_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _parse(self, raw):
+        # Same decoding and newline translation as open(file_path, "r", encoding="utf-8")
+        text = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8")
+        return next(csv.reader(text, delimiter=self.delimiter), [])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"Row index {index} is out of range. File has {count} rows.")
+        start, end = self._offsets[index], self._offsets[index + 1]
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            return self._parse(f.read(end - start))
+
+    def __iter__(self):
+        # Whole-file passes (e.g. reading a column) stream through csv.reader directly
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            yield from csv.reader(f, delimiter=self.delimiter)
+
+    def close(self):
+        # Nothing is held open between calls
+        pass
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import bisect
+import hashlib
+import threading
+
+# Persisted listings live with the package, not in the indexed folder (writing there would bump its mtime)
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rk_cache", "dir_index")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+# Set RK_DIR_WATCH=1 to also watch indexed folders for changes (needs the optional `watchdog` package)
+WATCH_DIRECTORIES = os.environ.get("RK_DIR_WATCH", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+class DirectoryIndex:
+    """
+    Sorted listing of the image files in one directory, kept in memory and on
+    disk between runs.
+
+    `refresh()` costs a single stat while the directory's mtime is unchanged;
+    when it changes, the folder is rescanned with os.scandir and only the added
+    and removed names are merged into the sorted list. len() and [i] (full
+    path) are O(1), and match sorted(glob(directory/*.png) + ...) exactly.
+    """
+
+    def __init__(self, directory, extensions=IMAGE_EXTENSIONS):
+        self.directory = directory
+        self.extensions = tuple(os.path.normcase(ext) for ext in extensions)
+        self.names = []
+        self.mtime_ns = None
+        self.rescans = 0
+        self._dirty = True  # set by the optional watcher
+        self._watcher = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def index_path(self):
+        digest = hashlib.sha1(os.path.abspath(self.directory).encode("utf-8")).hexdigest()
+        return os.path.join(INDEX_DIR, f"{digest}.json")
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved["directory"] == os.path.abspath(self.directory) and saved["extensions"] == list(self.extensions):
+                self.names = saved["names"]
+                self.mtime_ns = saved["mtime_ns"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(INDEX_DIR, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "directory": os.path.abspath(self.directory),
+                    "extensions": list(self.extensions),
+                    "mtime_ns": self.mtime_ns,
+                    "names": self.names,
+                }, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"[DEBUG] Could not save directory index {self.index_path}: {e}")
+
+    def _matches(self, name):
+        # Same rules as glob("*.png"): no hidden files, case-insensitive only where the OS is
+        return not name.startswith(".") and os.path.normcase(name).endswith(self.extensions)
+
+    def refresh(self):
+        with self._lock:
+            if self._watcher is not None and not self._dirty:
+                return self
+            mtime_ns = os.stat(self.directory).st_mtime_ns
+            if mtime_ns == self.mtime_ns and not (self._watcher is not None and self._dirty):
+                return self
+
+            self._dirty = False
+            with os.scandir(self.directory) as entries:
+                current = {entry.name for entry in entries if self._matches(entry.name)}
+            self._merge(current)
+            self.mtime_ns = mtime_ns
+            self.rescans += 1
+            self._save()
+        return self
+
+    def _merge(self, current):
+        previous = set(self.names)
+        added = current - previous
+        removed = previous - current
+        if len(added) + len(removed) > len(self.names) // 8:
+            self.names = sorted(current)
+            return
+        for name in removed:
+            del self.names[bisect.bisect_left(self.names, name)]
+        for name in added:
+            bisect.insort(self.names, name)
+
+    def watch(self):
+        """Starts a filesystem watcher that flags the index dirty on any change, if watchdog is installed."""
+        if self._watcher is not None:
+            return
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            print("[DEBUG] RK_DIR_WATCH is set but watchdog is not installed; using mtime checks only")
+            return
+
+        index = self
+
+        class MarkDirty(FileSystemEventHandler):
+            def on_any_event(self, event):
+                index._dirty = True
+
+        observer = Observer()
+        observer.schedule(MarkDirty(), self.directory, recursive=False)
+        observer.daemon = True
+        observer.start()
+        self._dirty = True
+        self._watcher = observer
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return os.path.join(self.directory, self.names[index])
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_directory_index(directory, extensions=IMAGE_EXTENSIONS):
+    """Returns the shared, refreshed index for `directory`."""
+    key = (os.path.abspath(directory), tuple(extensions))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DirectoryIndex(directory, extensions)
+            if WATCH_DIRECTORIES:
+                index.watch()
+    return index.refresh()
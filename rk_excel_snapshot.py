@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import mmap
+import struct
+import hashlib
+from array import array
+
+# Sidecar layout: 48-byte header, (rows * cols + 1) native int64 cell offsets, then the
+# UTF-8 text of every cell (as str(value)) back to back, row by row
+SNAPSHOT_SUFFIX = ".rkxl"
+SNAPSHOT_MAGIC = b"RKXL2" + (b"L" if sys.byteorder == "little" else b"B") + b"\0\0"
+# magic, workbook size, workbook mtime_ns, rows, cols, sheet id
+SNAPSHOT_HEADER = struct.Struct("<8sQQQQ8s")
+
+
+def sheet_id(sheet_name):
+    """8-byte digest of repr(sheet_name), so index 0, "0", "Sheet 1" and "Sheet_1" all differ."""
+    return hashlib.sha1(repr(sheet_name).encode("utf-8")).digest()[:8]
+
+
+class ExcelSnapshot:
+    """
+    Columnar on-disk copy of one worksheet, so rows can be read without
+    re-parsing the workbook XML.
+
+    The first open converts the sheet with pandas and writes every cell's text
+    to `<file>.<sheet id>.rkxl`, keyed on the workbook's size, mtime and the sheet.
+    Later opens memory-map that file; [i] decodes just the cells of row i.
+    """
+
+    def __init__(self, file_path, sheet_name=0):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.sheet_id = sheet_id(sheet_name)
+        stat = os.stat(file_path)
+        self.file_size = stat.st_size
+        self.file_mtime_ns = stat.st_mtime_ns
+
+        self._buffer = self._load_snapshot() or self._build_snapshot()
+        _, _, _, self.row_count, self.column_count, _ = SNAPSHOT_HEADER.unpack_from(self._buffer)
+        offsets_end = SNAPSHOT_HEADER.size + (self.row_count * self.column_count + 1) * 8
+        view = memoryview(self._buffer)
+        self._offsets = view[SNAPSHOT_HEADER.size:offsets_end].cast("q")
+        self._cells = view[offsets_end:]
+        view.release()
+
+    @property
+    def snapshot_path(self):
+        return f"{self.file_path}.{self.sheet_id.hex()}{SNAPSHOT_SUFFIX}"
+
+    @property
+    def nbytes(self):
+        if isinstance(self._buffer, mmap.mmap):
+            return self._offsets.nbytes  # cell text is paged in on demand
+        return len(self._buffer)
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                header = f.read(SNAPSHOT_HEADER.size)
+                if len(header) != SNAPSHOT_HEADER.size:
+                    return None
+                magic, size, mtime_ns, _, _, sheet = SNAPSHOT_HEADER.unpack(header)
+                if (magic, size, mtime_ns, sheet) != (SNAPSHOT_MAGIC, self.file_size, self.file_mtime_ns, self.sheet_id):
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+    def _build_snapshot(self):
+        import pandas as pd
+
+        df = pd.read_excel(self.file_path, header=None, sheet_name=self.sheet_name)
+        rows, cols = df.shape
+
+        offsets = array("q", [0])
+        cells = bytearray()
+        for row in df.itertuples(index=False, name=None):
+            for value in row:
+                cells += str(value).encode("utf-8")
+                offsets.append(len(cells))
+
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.file_size, self.file_mtime_ns, rows, cols, self.sheet_id)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                offsets.tofile(f)
+                f.write(cells)
+            os.replace(tmp_path, self.snapshot_path)
+            loaded = self._load_snapshot()
+            if loaded is not None:
+                return loaded
+        except OSError as e:
+            print(f"[DEBUG] Could not write Excel snapshot {self.snapshot_path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        # Read-only folder: serve this process from memory and convert again next time
+        return header + offsets.tobytes() + bytes(cells)
+
+    def __len__(self):
+        return self.row_count
+
+    def __getitem__(self, index):
+        """Returns row `index` as a list of cell strings (str() of the pandas value)."""
+        if index < 0:
+            index += self.row_count
+        if not 0 <= index < self.row_count:
+            raise IndexError(f"Row index {index} is out of range. File has {self.row_count} rows.")
+        first = index * self.column_count
+        offsets = self._offsets[first:first + self.column_count + 1]
+        return [str(self._cells[offsets[i]:offsets[i + 1]], "utf-8") for i in range(self.column_count)]
+
+    def close(self):
+        self._offsets.release()
+        self._cells.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
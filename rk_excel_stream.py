@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+class ExcelRowStream:
+    """
+    Forward-only row cursor over a worksheet opened with openpyxl in read-only
+    mode, for sheets too large to load as a DataFrame.
+
+    The cursor remembers the row it stopped at, so increasing row requests
+    (the increment loop) continue from there instead of re-reading the sheet,
+    and the last row returned is kept, so asking for it again (a disabled loop,
+    or two nodes on the same row) costs nothing. Any other request behind the
+    cursor reopens the workbook and streams from the top: openpyxl can't seek
+    inside the sheet XML, so wrap-around and random loops re-read the sheet up
+    to the requested row every time. At most two rows are held in memory.
+    """
+
+    # Reported to the table cache; the workbook itself is streamed, not held
+    nbytes = 64 * 1024
+
+    def __init__(self, file_path, sheet_name=None):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.restarts = 0
+        self._workbook = None
+        self._last_index = -1
+        self._last_row = None
+        self._open()
+
+    def _open(self):
+        from openpyxl import load_workbook
+
+        self.close()
+        self._workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        sheet = self._workbook[self.sheet_name] if self.sheet_name else self._workbook.worksheets[0]
+        # Taken from the sheet's stored dimensions; None if the writer didn't record them
+        self.row_count = sheet.max_row
+        self.column_count = sheet.max_column
+        self._rows = sheet.iter_rows(values_only=True)
+        self.position = 0  # index of the next row the iterator yields
+
+    def __len__(self):
+        return self.row_count or 0
+
+    def __getitem__(self, index):
+        """
+        Returns row `index` as a list of values, with empty cells as NaN and
+        short rows padded, like pd.read_excel(header=None) (without its dtype upcasting).
+        """
+        if index < 0:
+            raise IndexError("Streaming mode does not support negative row indices.")
+        if index == self._last_index:
+            return list(self._last_row)
+        if index < self.position:
+            self._open()
+            self.restarts += 1
+
+        for row in self._rows:
+            self.position += 1
+            if self.position - 1 == index:
+                values = [float("nan") if value is None else value for value in row]
+                if self.column_count and len(values) < self.column_count:
+                    values.extend([float("nan")] * (self.column_count - len(values)))
+                self._last_index, self._last_row = index, values
+                return list(values)
+        raise IndexError(f"Row index {index} is out of range. Sheet has {self.position} rows.")
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_MB = int(os.environ.get("RK_PREFETCH_MB", "1024"))
+DEFAULT_WORKERS = int(os.environ.get("RK_PREFETCH_WORKERS", "2"))
+
+
+def estimate_nbytes(value):
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(v) for v in value)
+    if isinstance(value, str):
+        return len(value)
+    return int(getattr(value, "nbytes", 0))
+
+
+class Prefetcher:
+    """
+    Runs loads ahead of time on a small thread pool and keeps the results until
+    they are asked for.
+
+    `prefetch(key, fn, *args, owner=...)` schedules fn(*args) in the background
+    unless the finished-but-unclaimed results already use `max_bytes`.
+    `get(key, fn, *args)` returns (and forgets) the prefetched result, waiting
+    for it if it's still running, or calls fn(*args) directly on a miss or a
+    failed prefetch. `retain(keys, owner=...)` only touches that owner's keys,
+    so several consumers (e.g. two viewer nodes) can share one pool.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_bytes=DEFAULT_MAX_MB * 2**20):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rk_prefetch")
+        self._futures = OrderedDict()  # key -> Future
+        self._sizes = {}  # key -> bytes, for finished futures
+        self._owners = {}  # key -> set of owners that asked for it
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        return self._executor
+
+    def prefetch(self, key, fn, *args, owner=None):
+        with self._lock:
+            if key in self._futures:
+                self._owners[key].add(owner)
+                return
+            if self.total_bytes >= self.max_bytes:
+                return
+            future = self._executor.submit(fn, *args)
+            self._futures[key] = future
+            self._owners[key] = {owner}
+        future.add_done_callback(lambda f: self._account(key, f))
+
+    def _account(self, key, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        size = estimate_nbytes(future.result())
+        with self._lock:
+            if self._futures.get(key) is future:
+                self._sizes[key] = size
+                self.total_bytes += size
+
+    def _pop(self, key):
+        future = self._futures.pop(key, None)
+        self.total_bytes -= self._sizes.pop(key, 0)
+        self._owners.pop(key, None)
+        return future
+
+    def get(self, key, fn, *args):
+        with self._lock:
+            future = self._pop(key)
+        if future is not None:
+            try:
+                result = future.result()
+                self.hits += 1
+                return result
+            except Exception:
+                pass  # Load it again below so the caller sees the real error
+        self.misses += 1
+        return fn(*args)
+
+    def retain(self, keys, owner=None):
+        """
+        Releases `owner`'s claim on every key not in `keys`; a pending or cached
+        result is dropped once no owner wants it any more.
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in [k for k, owners in self._owners.items() if owner in owners and k not in keys]:
+                self._owners[key].discard(owner)
+                if not self._owners[key]:
+                    self._pop(key).cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._futures) - len(self._sizes),
+                "ready": len(self._sizes),
+                "ready_mb": round(self.total_bytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
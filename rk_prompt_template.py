@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import re
+import functools
+
+# {col:B|upper|default:none}, {row}, and {{ / }} for literal braces
+FIELD_PATTERN = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+
+# Same cleanup the CSV loopers apply to every column they return
+QUOTE_CHARS = ' "“”'
+
+FILTERS = {
+    "upper": lambda text, arg: text.upper(),
+    "lower": lambda text, arg: text.lower(),
+    "title": lambda text, arg: text.title(),
+    "capitalize": lambda text, arg: text.capitalize(),
+    "trim": lambda text, arg: text.strip(),
+    "default": lambda text, arg: text or arg,
+    "prefix": lambda text, arg: f"{arg}{text}" if text else text,
+    "suffix": lambda text, arg: f"{text}{arg}" if text else text,
+}
+
+
+def column_letter_to_index(column_letter):
+    """0-based index of a spreadsheet column ("A" -> 0, "AA" -> 26); raises ValueError if it isn't letters."""
+    if not column_letter:
+        raise ValueError("Empty column letter")
+    index = 0
+    for char in column_letter.upper():
+        if 'A' <= char <= 'Z':
+            index = index * 26 + (ord(char) - ord('A') + 1)
+        else:
+            raise ValueError(f"Invalid column letter: {column_letter}")
+    return index - 1
+
+
+def compile_field(field):
+    name, *filter_specs = [part.strip() for part in field.split("|")]
+
+    if name == "row":
+        def value(row, row_index):
+            return str(row_index)
+    elif name.startswith("col:"):
+        try:
+            column = column_letter_to_index(name[4:].strip())
+        except ValueError as e:
+            raise ValueError(f"{e} in {{{field}}}") from None
+
+        def value(row, row_index):
+            return str(row[column]).strip(QUOTE_CHARS) if column < len(row) else ""
+    else:
+        raise ValueError(f"Unknown template field: {{{field}}}")
+
+    filters = []
+    for spec in filter_specs:
+        filter_name, _, arg = spec.partition(":")
+        if filter_name not in FILTERS:
+            raise ValueError(f"Unknown template filter '{filter_name}' in {{{field}}}")
+        filters.append((FILTERS[filter_name], arg))
+
+    if not filters:
+        return value
+
+    def filtered(row, row_index):
+        text = value(row, row_index)
+        for apply_filter, arg in filters:
+            text = apply_filter(text, arg)
+        return text
+    return filtered
+
+
+class PromptTemplate:
+    """
+    A template parsed once into literal text and field functions, e.g.
+    "{col:B|upper} and {col:D}". Fields are {col:<letter>} (a column of the row)
+    and {row} (the row index); filters (upper, lower, title, capitalize, trim,
+    default:x, prefix:x, suffix:x) are applied left to right.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = []  # str literals and field functions
+        literal = []
+        position = 0
+        for match in FIELD_PATTERN.finditer(template):
+            literal.append(template[position:match.start()])
+            position = match.end()
+            if match.group(0) in ("{{", "}}"):
+                literal.append(match.group(0)[0])
+                continue
+            if "".join(literal):
+                self.parts.append("".join(literal))
+            literal = []
+            self.parts.append(compile_field(match.group(1)))
+        literal.append(template[position:])
+        if "".join(literal):
+            self.parts.append("".join(literal))
+
+    def render(self, row, row_index=0):
+        return "".join(part if isinstance(part, str) else part(row, row_index) for part in self.parts)
+
+    def render_rows(self, rows, row_indices):
+        return [self.render(row, row_index) for row, row_index in zip(rows, row_indices)]
+
+
+@functools.lru_cache(maxsize=128)
+def compile_template(template):
+    """Parses `template` once; later calls with the same text reuse the compiled form."""
+    return PromptTemplate(template)
@@ -1,9 +1,7 @@
 import os
-import json
-import numpy as np
 from PIL import Image
-from PIL.PngImagePlugin import PngInfo
 import folder_paths
+from rk_save_utils import reserve_counter, images_to_uint8, save_encoded, save_deduplicated, DEDUP_MODES, save_queue, finish_saves, METADATA_MODES, serialize_metadata, prepare_metadata, save_preview, preview_name, preview_queue
 
 class rk_save_image:
     @classmethod
@@ -14,6 +12,18 @@ class rk_save_image:
                 "filename_prefix": ("STRING", {"default": "ComfyUI"}),
                 "save_metadata": ("BOOLEAN", {"default": True}),
             },
+            "optional": {
+                # wait: encode in parallel, return when written; background: return at once; flush: also wait for earlier background saves
+                "save_mode": (["wait", "background", "flush"], {"default": "wait"}),
+                # Store each distinct image once (in .rk_blobs) and hardlink the numbered names to it
+                "dedup_mode": (DEDUP_MODES, {"default": "off"}),
+                # embed: full workflow in every PNG; sidecar/jsonl: stored once, PNGs reference it by hash
+                "metadata_mode": (METADATA_MODES, {"default": "embed"}),
+                "embed_metadata_hash": ("BOOLEAN", {"default": True}),
+                # Show small WebP previews (from the temp folder) in the UI instead of the full-size files
+                "ui_preview": ("BOOLEAN", {"default": False}),
+                "preview_size": ("INT", {"default": 512, "min": 64, "max": 4096, "step": 64}),
+            },
             "hidden": {"prompt": "PROMPT", "extra_pnginfo": "EXTRA_PNGINFO"},
         }
 
@@ -22,51 +32,63 @@ class rk_save_image:
     OUTPUT_NODE = True
     CATEGORY = "RK_tools_v02"
 
-    def save_images(self, images, filename_prefix="ComfyUI", save_metadata=True, prompt=None, extra_pnginfo=None):
+    def save_images(self, images, filename_prefix="ComfyUI", save_metadata=True, save_mode="wait", dedup_mode="off", metadata_mode="embed", embed_metadata_hash=True, ui_preview=False, preview_size=512, prompt=None, extra_pnginfo=None):
         output_dir = folder_paths.get_output_directory()
         
-        # Find the highest existing number
-        existing_files = [f for f in os.listdir(output_dir) if f.startswith(filename_prefix) and f.endswith('.png')]
-        highest_num = 0
-        
-        for file in existing_files:
-            try:
-                # Extract number from filename (e.g., "ComfyUI_00001.png" -> 1)
-                num = int(file.split('_')[-1].split('.')[0])
-                highest_num = max(highest_num, num)
-            except:
-                continue
-        
-        # Start numbering from the next number
-        counter = highest_num + 1
+        # Reserve numbers for the whole batch (the folder is only scanned the first time)
+        counter = reserve_counter(output_dir, filename_prefix, "png", len(images))
         
+        preview_dir = None
+        if ui_preview:
+            preview_dir = folder_paths.get_temp_directory()
+            os.makedirs(preview_dir, exist_ok=True)
+
         results = list()
-        for image in images:
-            i = 255. * image.cpu().numpy()
-            img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-            
-            metadata = PngInfo()
-            if save_metadata:
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
-                if extra_pnginfo is not None:
-                    for x in extra_pnginfo:
-                        metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+        futures = []
+        preview_futures = []
+
+        # Metadata, serialized once for the whole batch
+        metadata = None
+        metadata_texts = serialize_metadata(prompt, extra_pnginfo) if save_metadata else []
+        if metadata_texts:
+            _, metadata = prepare_metadata(output_dir, metadata_texts, metadata_mode, embed_metadata_hash)
+
+        # Whole batch to uint8 in one pass, one device transfer
+        for pixels in images_to_uint8(images):
+            img = Image.fromarray(pixels)
             
             # Format filename with counter
             file = f"{filename_prefix}_{counter:05}.png"
             full_path = os.path.join(output_dir, file)
             
-            # Save the image
-            img.save(full_path, pnginfo=metadata, optimize=True)
+            # Encode and save the image on the save pool
+            save_kwargs = {"pnginfo": metadata, "optimize": True}
+            if dedup_mode != "off":
+                futures.append(save_queue.submit(save_deduplicated, img, [full_path], "png", save_kwargs, dedup_mode))
+            else:
+                futures.append(save_queue.submit(save_encoded, img, [full_path], "png", save_kwargs))
             
-            results.append({
-                "filename": file,
-                "subfolder": "",
-                "type": "output"
-            })
+            if preview_dir:
+                # Small WebP for the UI, encoded on its own pool
+                preview_file = preview_name(file)
+                preview_futures.append(preview_queue.submit(save_preview, img, os.path.join(preview_dir, preview_file), preview_size))
+                results.append({
+                    "filename": preview_file,
+                    "subfolder": "",
+                    "type": "temp"
+                })
+            else:
+                results.append({
+                    "filename": file,
+                    "subfolder": "",
+                    "type": "output"
+                })
             counter += 1
 
+        finish_saves(futures, save_mode)
+        # The UI fetches the previews right away
+        preview_queue.wait(preview_futures)
+
         return {"ui": {"images": results}}
 
 NODE_CLASS_MAPPINGS = {
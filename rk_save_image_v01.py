@@ -1,12 +1,54 @@
 import os
-import json
+import functools
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from PIL.PngImagePlugin import PngInfo
 import folder_paths
+from rk_save_utils import reserve_counter, images_to_uint8, save_encoded, save_deduplicated, DEDUP_MODES, save_queue, finish_saves, METADATA_MODES, serialize_metadata, prepare_metadata, save_preview, preview_name, preview_queue, SAVE_PROFILES, get_save_settings
 import platform
 import subprocess
 
+WATERMARK_HEIGHT = 50
+WATERMARK_FONT_SIZE = 28
+
+
+@functools.lru_cache(maxsize=8)
+def load_watermark_font(font_size):
+    # Larger font attempt:
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)  # If you have Arial installed
+    except:
+        return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=32)
+def render_watermark_banner(text, width, font_size=WATERMARK_FONT_SIZE, banner_height=WATERMARK_HEIGHT):
+    """Black banner strip with the text centered in white, as a read-only [banner_height, width, 3] uint8 array."""
+    font = load_watermark_font(font_size)
+    banner = Image.new('RGB', (width, banner_height), color='black')
+    draw = ImageDraw.Draw(banner)
+    bbox = draw.textbbox((0, 0), text, font=font)  # (left, top, right, bottom)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    x = (width - text_width) // 2
+    y = (banner_height - text_height) // 2
+    draw.text((x, y), text, fill="white", font=font)
+    return np.asarray(banner)
+
+
+def add_watermark(pixels, text):
+    """
+    Appends the watermark banner below [H,W,C] or [B,H,W,C] uint8 pixels.
+    The result is allocated once and filled with two slice copies.
+    """
+    height, width = pixels.shape[-3], pixels.shape[-2]
+    banner = render_watermark_banner(text, width)
+    output = np.empty(pixels.shape[:-3] + (height + banner.shape[0], width, 3), dtype=np.uint8)
+    output[..., :height, :, :] = pixels[..., :3]
+    output[..., height:, :, :] = banner  # broadcast over the batch
+    return output
+
+
 class rk_save_image_v01:
     @classmethod
     def INPUT_TYPES(s):
@@ -27,6 +69,22 @@ class rk_save_image_v01:
                 "enable_custom_path": ("BOOLEAN", {"default": False}),
                 "custom_path": ("STRING", {"default": "E:/Image_output/CB"}),
             },
+            "optional": {
+                # wait: encode in parallel, return when written; background: return at once; flush: also wait for earlier background saves
+                "save_mode": (["wait", "background", "flush"], {"default": "wait"}),
+                # Encoder speed/size trade-off; "lossless-webp" always writes lossless WebP
+                "compression_profile": (list(SAVE_PROFILES), {"default": "legacy"}),
+                # Watermark the whole batch in one array operation (needs one extra batch-sized buffer)
+                "watermark_batch": ("BOOLEAN", {"default": False}),
+                # Store each distinct image once (in .rk_blobs) and hardlink the numbered names to it
+                "dedup_mode": (DEDUP_MODES, {"default": "off"}),
+                # embed: full workflow in every PNG; sidecar/jsonl: stored once, PNGs reference it by hash
+                "metadata_mode": (METADATA_MODES, {"default": "embed"}),
+                "embed_metadata_hash": ("BOOLEAN", {"default": True}),
+                # Show small WebP previews (from the temp folder) in the UI instead of the full-size files
+                "ui_preview": ("BOOLEAN", {"default": False}),
+                "preview_size": ("INT", {"default": 512, "min": 64, "max": 4096, "step": 64}),
+            },
             "hidden": {
                 "prompt": "PROMPT",
                 "extra_pnginfo": "EXTRA_PNGINFO"
@@ -51,12 +109,31 @@ class rk_save_image_v01:
                     enable_custom_path=False,
                     custom_path="E:/Image_output/CB",
 
+                    save_mode="wait",
+                    compression_profile="legacy",
+                    watermark_batch=False,
+                    dedup_mode="off",
+                    metadata_mode="embed",
+                    embed_metadata_hash=True,
+                    ui_preview=False,
+                    preview_size=512,
+
                     prompt=None,
                     extra_pnginfo=None):
         """
         Always saves to ComfyUI's default output folder so previews work.
-        If enable_custom_path is True, also saves a second copy to custom_path.
+        If enable_custom_path is True, also saves a second copy to custom_path
+        (a hardlink or byte copy of the same encoded file).
+        Images are encoded on a thread pool; see save_mode.
+        compression_profile picks the encoder settings; when the node waits for
+        its saves, each UI entry also reports bytes written and encode time.
         Watermark is optional, appended as a black bar at the bottom using a larger font.
+        watermark_batch composites the banner onto the whole batch at once.
+        dedup_mode "encoded"/"pixels" links repeated images to one stored copy.
+        Metadata is serialized once per call; metadata_mode "sidecar"/"jsonl"
+        stores it once next to the outputs (for every format) instead of in each PNG.
+        ui_preview points the UI at small WebP previews in the temp folder; only
+        those are waited for in "background" save_mode.
         Resolution info is displayed automatically by ComfyUI (width/height).
         """
 
@@ -73,91 +150,96 @@ class rk_save_image_v01:
             # Attempt to create the folder
             os.makedirs(custom_dir, exist_ok=True)
 
-        # Find highest existing number in ComfyUI's folder
-        existing_files = [
-            f for f in os.listdir(comfyui_output_dir)
-            if f.startswith(filename_prefix) and f.lower().endswith(f'.{image_format.lower()}')
-        ]
-        highest_num = 0
-        for file in existing_files:
-            try:
-                num = int(file.split('_')[-1].split('.')[0])
-                highest_num = max(highest_num, num)
-            except:
-                pass
-
-        counter = highest_num + 1
-        results = []
+        preview_dir = None
+        if ui_preview:
+            preview_dir = folder_paths.get_temp_directory()
+            os.makedirs(preview_dir, exist_ok=True)
 
-        for image in images:
-            # Convert tensor to PIL
-            arr = 255.0 * image.cpu().numpy()
-            img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8))
+        # Encoder settings (the profile may switch the format, e.g. lossless-webp)
+        image_format, profile_kwargs = get_save_settings(compression_profile, image_format)
 
-            # Watermark
-            if enable_watermark:
-                banner_height = 50
-                new_img = Image.new('RGB', (img.width, img.height + banner_height), color='black')
-                new_img.paste(img, (0, 0))
-
-                # Larger font attempt:
-                try:
-                    font = ImageFont.truetype("arial.ttf", 28)  # If you have Arial installed
-                except:
-                    font = ImageFont.load_default()
+        # Reserve numbers for the whole batch in ComfyUI's folder (scanned only the first time)
+        counter = reserve_counter(comfyui_output_dir, filename_prefix, image_format, len(images))
+        results = []
+        futures = []
+        preview_futures = []
 
-                draw = ImageDraw.Draw(new_img)
-                bbox = draw.textbbox((0, 0), watermark_text, font=font)  # (left, top, right, bottom)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
+        # Metadata, serialized once for the whole batch
+        pnginfo = None
+        if save_metadata and (image_format.lower() == "png" or metadata_mode != "embed"):
+            metadata_texts = serialize_metadata(prompt, extra_pnginfo)
+            if metadata_texts:
+                _, pnginfo = prepare_metadata(comfyui_output_dir, metadata_texts, metadata_mode, embed_metadata_hash)
 
-                x = (new_img.width - text_width) // 2
-                y = img.height + (banner_height - text_height) // 2
-                draw.text((x, y), watermark_text, fill="white", font=font)
+        # Convert the whole batch to uint8 at once (one device transfer), then wrap each image
+        batch_pixels = images_to_uint8(images)
+        if enable_watermark and watermark_batch:
+            batch_pixels = add_watermark(batch_pixels, watermark_text)
 
-                img = new_img
+        for pixels in batch_pixels:
+            # Watermark (the banner is rendered once per text and width)
+            if enable_watermark and not watermark_batch:
+                pixels = add_watermark(pixels, watermark_text)
 
-            # Metadata (PNG only)
-            pnginfo = None
-            if image_format.lower() == "png" and save_metadata:
-                pnginfo = PngInfo()
-                if prompt is not None:
-                    pnginfo.add_text("prompt", json.dumps(prompt))
-                if extra_pnginfo is not None:
-                    for k, v in extra_pnginfo.items():
-                        pnginfo.add_text(k, json.dumps(v))
+            img = Image.fromarray(pixels)
 
             # Save to ComfyUI folder (for preview)
             file_name = f"{filename_prefix}_{counter:05}.{image_format.lower()}"
             comfyui_full_path = os.path.join(comfyui_output_dir, file_name)
 
-            if image_format.lower() == "png":
-                img.save(comfyui_full_path, pnginfo=pnginfo, optimize=True)
-            else:
-                img.save(comfyui_full_path, optimize=True)
+            save_paths = [comfyui_full_path]
 
             # If custom path is enabled, save second copy
             if custom_dir:
-                custom_full_path = os.path.join(custom_dir, file_name)
-                if image_format.lower() == "png":
-                    img.save(custom_full_path, pnginfo=pnginfo, optimize=True)
-                else:
-                    img.save(custom_full_path, optimize=True)
+                save_paths.append(os.path.join(custom_dir, file_name))
+
+            save_kwargs = dict(profile_kwargs)
+            # Metadata (PNG only)
+            if image_format.lower() == "png" and pnginfo is not None:
+                save_kwargs["pnginfo"] = pnginfo
+
+            # Encoded once on the save pool, then written to every path
+            if dedup_mode != "off":
+                futures.append(save_queue.submit(save_deduplicated, img, save_paths, image_format, save_kwargs, dedup_mode))
+            else:
+                futures.append(save_queue.submit(save_encoded, img, save_paths, image_format, save_kwargs))
 
             # Gather resolution
             width, height = img.size
 
             # Add to results so ComfyUI displays them
-            results.append({
-                "filename": file_name,
-                "subfolder": "",
-                "type": "output",
-                "width": width,
-                "height": height
-            })
+            if preview_dir:
+                # Preview encoded on its own pool, next to the full-size save
+                preview_file = preview_name(file_name)
+                preview_futures.append(preview_queue.submit(save_preview, img, os.path.join(preview_dir, preview_file), preview_size))
+                results.append({
+                    "filename": preview_file,
+                    "subfolder": "",
+                    "type": "temp",
+                    "output_filename": file_name,
+                    "width": width,
+                    "height": height
+                })
+            else:
+                results.append({
+                    "filename": file_name,
+                    "subfolder": "",
+                    "type": "output",
+                    "width": width,
+                    "height": height
+                })
 
             counter += 1
 
+        finish_saves(futures, save_mode)
+        # The UI fetches the previews right away
+        preview_queue.wait(preview_futures)
+
+        if save_mode != "background":
+            # Per-image encode time and bytes written
+            for result, future in zip(results, futures):
+                result.update(future.result())
+
         # Optionally open explorer (ComfyUI folder)
         if open_explorer_after_saving:
             if platform.system() == "Windows":
@@ -0,0 +1,411 @@
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import torch
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from rk_state_store import state_store
+
+# Encoder threads shared by the save nodes. Pillow's zlib/libjpeg/libwebp encoders release
+# the GIL, so a thread pool encodes a batch in parallel without pickling images to processes.
+SAVE_WORKERS = int(os.environ.get("RK_SAVE_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def scan_highest_counter(directory, filename_prefix, extension):
+    """Highest N among existing `<prefix>..._N.<extension>` files (0 if none)."""
+    highest_num = 0
+    suffix = f".{extension.lower()}"
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith(filename_prefix) and name.lower().endswith(suffix):
+                try:
+                    # Extract number from filename (e.g., "ComfyUI_00001.png" -> 1)
+                    highest_num = max(highest_num, int(name.split('_')[-1].split('.')[0]))
+                except ValueError:
+                    pass
+    return highest_num
+
+
+def reserve_counter(directory, filename_prefix, extension, count):
+    """
+    Reserves `count` consecutive file numbers for `filename_prefix` in `directory`
+    and returns the first one.
+
+    The next free number is kept per (directory, prefix, extension) in the shared
+    state store, so the output folder is scanned once instead of on every save,
+    and concurrent workers always get disjoint numbers. If a reserved name
+    already exists (files written by something else), the folder is rescanned and
+    the counter moves past both the scan and any numbers already handed out.
+    """
+    key = f"save_counter:{os.path.abspath(directory)}:{filename_prefix}:{extension.lower()}"
+
+    def next_free():
+        return scan_highest_counter(directory, filename_prefix, extension) + 1
+
+    first, _ = state_store.update(key, next_free, lambda number: number + count)
+
+    reserved = (os.path.join(directory, f"{filename_prefix}_{n:05}.{extension.lower()}") for n in range(first, first + count))
+    if any(os.path.exists(path) for path in reserved):
+        # Never move the counter back: blocks handed to other workers may not be on disk yet
+        _, after = state_store.update(key, next_free, lambda number: max(number, next_free()) + count)
+        first = after - count
+    return first
+
+
+# Encoder settings per profile and format. PNG is lossless at every level, only speed and size change;
+# "legacy" is what the save nodes used before profiles existed, and stays the default.
+SAVE_PROFILES = {
+    "fast": {
+        "png": {"compress_level": 1},
+        "jpeg": {"quality": 90, "subsampling": 2},
+        "webp": {"quality": 85, "method": 0},
+    },
+    "balanced": {
+        "png": {"compress_level": 6},
+        "jpeg": {"quality": 95, "subsampling": 0},
+        "webp": {"quality": 90, "method": 4},
+    },
+    "archival": {
+        "png": {"compress_level": 9, "optimize": True},
+        "jpeg": {"quality": 100, "subsampling": 0, "optimize": True},
+        "webp": {"quality": 100, "method": 6},
+    },
+    # Always written as lossless WebP, whatever image_format is
+    "lossless-webp": {
+        "webp": {"lossless": True, "quality": 100, "method": 6},
+    },
+    "legacy": {
+        "png": {"optimize": True},
+        "jpeg": {"optimize": True},
+        "webp": {"optimize": True},
+    },
+}
+
+
+def get_save_settings(profile, image_format):
+    """Returns (image_format, encoder kwargs) for a profile; a profile may force its own format."""
+    settings = SAVE_PROFILES.get(profile, SAVE_PROFILES["legacy"])
+    image_format = image_format.lower()
+    if image_format not in settings:
+        image_format = next(iter(settings))
+    return image_format, dict(settings[image_format])
+
+
+def images_to_uint8(images):
+    """
+    Converts a [B,H,W,C] float image batch in [0, 1] to a [B,H,W,C] uint8 numpy array.
+
+    The scale/clamp/cast runs once for the whole batch on the tensor's own device,
+    followed by a single transfer into a fresh CPU buffer; per-image arrays are
+    views into it. Values match `np.clip(255.0 * x, 0, 255).astype(np.uint8)`.
+    The buffer isn't reused across calls: PIL shares the memory of RGBA arrays,
+    and background saves may still be reading the previous batch.
+    """
+    with torch.no_grad():
+        pixels = torch.clamp(images * 255.0, 0, 255).to(torch.uint8)
+        if pixels.device.type != "cpu":
+            pixels = pixels.cpu()
+    return pixels.numpy()
+
+
+# embed: the full prompt/workflow in every PNG; sidecar: one <hash>.json per distinct metadata in
+# <output>/rk_metadata/; jsonl: one line per distinct metadata in <output>/rk_metadata.jsonl
+METADATA_MODES = ["embed", "sidecar", "jsonl"]
+METADATA_DIR_NAME = "rk_metadata"
+METADATA_LOG_NAME = "rk_metadata.jsonl"
+
+_logged_metadata = set()
+_metadata_lock = threading.Lock()
+
+
+def serialize_metadata(prompt, extra_pnginfo):
+    """JSON-encodes the prompt and extra_pnginfo once per save call, as [(key, json_text)]."""
+    texts = []
+    if prompt is not None:
+        texts.append(("prompt", json.dumps(prompt)))
+    if extra_pnginfo is not None:
+        for key, value in extra_pnginfo.items():
+            texts.append((key, json.dumps(value)))
+    return texts
+
+
+def metadata_document(texts):
+    # The texts are already JSON, so the document is assembled without encoding them again
+    return "{" + ", ".join(f"{json.dumps(key)}: {text}" for key, text in texts) + "}"
+
+
+def prepare_metadata(directory, texts, metadata_mode="embed", embed_hash=True):
+    """
+    Writes the call's metadata as `metadata_mode` asks and returns
+    (hash, PngInfo shared by every image of the batch).
+
+    In "sidecar" and "jsonl" mode each distinct metadata is stored once and the
+    PNGs only carry its hash (`rk_metadata_hash`), or nothing if embed_hash is off.
+    """
+    document = metadata_document(texts)
+    digest = hashlib.sha256(document.encode("utf-8")).hexdigest()
+    pnginfo = PngInfo()
+
+    if metadata_mode == "sidecar":
+        sidecar_path = os.path.join(directory, METADATA_DIR_NAME, f"{digest}.json")
+        if not os.path.exists(sidecar_path):
+            os.makedirs(os.path.dirname(sidecar_path), exist_ok=True)
+            write_bytes(sidecar_path, document.encode("utf-8"))
+    elif metadata_mode == "jsonl":
+        log_path = os.path.join(directory, METADATA_LOG_NAME)
+        with _metadata_lock:
+            # Logged once per process; a restart may repeat a line, readers keep the first
+            if (log_path, digest) not in _logged_metadata:
+                line = f'{{"hash": "{digest}", "time": {time.time():.3f}, "metadata": {document}}}\n'
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                _logged_metadata.add((log_path, digest))
+    else:
+        for key, text in texts:
+            pnginfo.add_text(key, text)
+        return digest, pnginfo
+
+    if embed_hash:
+        pnginfo.add_text("rk_metadata_hash", digest)
+    return digest, pnginfo
+
+
+def encode_image(img, image_format, save_kwargs):
+    """Encodes a PIL image once, in memory."""
+    buffer = io.BytesIO()
+    try:
+        img.save(buffer, format=image_format.upper(), **save_kwargs)
+    except OSError:
+        if not save_kwargs.get("optimize"):
+            raise
+        # libjpeg's optimize pass needs the whole file in Pillow's size-guessed buffer,
+        # which very noisy images at high quality can overflow
+        buffer = io.BytesIO()
+        img.save(buffer, format=image_format.upper(), **{k: v for k, v in save_kwargs.items() if k != "optimize"})
+    return buffer.getvalue()
+
+
+def write_bytes(path, data):
+    # Write under a temporary name and rename, so a reader never sees a half-written image
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def link_or_write(source_path, path, data):
+    """Hardlinks `path` to an already written file, or writes the same bytes if linking isn't possible."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.link(source_path, tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Different drive, or a filesystem without hardlinks
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        write_bytes(path, data)
+
+
+def save_encoded(img, paths, image_format, save_kwargs):
+    """
+    Encodes `img` once and stores it at every path in `paths`.
+    Returns {"bytes": encoded size, "encode_ms": encoding time}.
+    """
+    start = time.perf_counter()
+    data = encode_image(img, image_format, save_kwargs)
+    encode_ms = (time.perf_counter() - start) * 1000.0
+    write_bytes(paths[0], data)
+    for path in paths[1:]:
+        link_or_write(paths[0], path, data)
+    print(f"[DEBUG] Saved {os.path.basename(paths[0])}: {len(data) / 1024:.0f} KB, encoded in {encode_ms:.0f} ms")
+    return {"bytes": len(data), "encode_ms": round(encode_ms, 1)}
+
+
+# Small, quickly encoded previews for the UI, written to ComfyUI's temp folder
+PREVIEW_SETTINGS = {"quality": 80, "method": 0}
+
+
+def preview_name(file_name):
+    return f"{file_name}.preview.webp"
+
+
+def save_preview(img, path, max_size):
+    """Writes a WebP of `img` scaled so its longest side is at most max_size."""
+    scale = max_size / max(img.size)
+    if scale < 1:
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        img = img.resize(size, Image.BILINEAR, reducing_gap=2.0)
+    write_bytes(path, encode_image(img, "webp", PREVIEW_SETTINGS))
+
+
+# Content-addressed saving: "encoded" hashes the encoded file, "pixels" hashes the pixels plus the
+# encoder settings first, so a repeated image isn't even re-encoded
+DEDUP_MODES = ["off", "encoded", "pixels"]
+BLOB_DIR_NAME = ".rk_blobs"
+
+
+class ContentStore:
+    """
+    Keeps one blob per distinct image under `<root>/<hash[:2]>/<hash>.<ext>`.
+    The numbered files users see are hardlinks to the blob (symlinks, or plain
+    copies, where hardlinks aren't possible), and `<root>/index.jsonl` gets a
+    {"hash", "path"} line for every name created.
+
+    Hardlinked names share their bytes: editing one file in place edits them all.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def blob_path(self, digest, extension):
+        return os.path.join(self.root, digest[:2], f"{digest}.{extension.lower()}")
+
+    def put(self, blob_path, data):
+        """Stores `data` as `blob_path` unless it's already there; returns True if it was."""
+        if os.path.exists(blob_path):
+            return True
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        write_bytes(blob_path, data)
+        return False
+
+    def link(self, blob_path, path):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                os.link(blob_path, tmp_path)
+            except OSError:
+                # Different drive, or a filesystem without hardlinks
+                try:
+                    os.symlink(os.path.abspath(blob_path), tmp_path)
+                except OSError:
+                    shutil.copyfile(blob_path, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+
+    def record(self, digest, paths):
+        lines = "".join(json.dumps({"hash": digest, "path": os.path.abspath(path)}) + "\n" for path in paths)
+        with self._lock:
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+_content_stores = {}
+_content_stores_lock = threading.Lock()
+
+
+def get_content_store(directory):
+    """The blob store for an output folder (`<directory>/.rk_blobs`)."""
+    root = os.path.join(os.path.abspath(directory), BLOB_DIR_NAME)
+    with _content_stores_lock:
+        if root not in _content_stores:
+            _content_stores[root] = ContentStore(root)
+        return _content_stores[root]
+
+
+def pixel_digest(img, image_format, save_kwargs):
+    """Hash of the pixels and everything that affects the encoded file (format, settings, PNG text chunks)."""
+    digest = hashlib.sha256()
+    digest.update(f"{img.mode}:{img.size}:{image_format.lower()}".encode())
+    for key in sorted(save_kwargs):
+        value = save_kwargs[key]
+        digest.update(f"{key}={getattr(value, 'chunks', value)!r};".encode())
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def save_deduplicated(img, paths, image_format, save_kwargs, dedup_mode):
+    """
+    Like save_encoded, but stores the image once in the content store of the
+    first path's folder and links every path in `paths` to that blob.
+    Returns {"bytes", "encode_ms", "deduplicated"}; a repeated image costs no
+    encoding in "pixels" mode and no image write in either mode.
+    """
+    store = get_content_store(os.path.dirname(paths[0]))
+    encode_ms = 0.0
+    data = None
+    if dedup_mode == "pixels":
+        digest = pixel_digest(img, image_format, save_kwargs)
+        blob_path = store.blob_path(digest, image_format)
+        deduplicated = os.path.exists(blob_path)
+    else:
+        deduplicated = False
+    if not deduplicated:
+        start = time.perf_counter()
+        data = encode_image(img, image_format, save_kwargs)
+        encode_ms = (time.perf_counter() - start) * 1000.0
+        if dedup_mode != "pixels":
+            digest = hashlib.sha256(data).hexdigest()
+            blob_path = store.blob_path(digest, image_format)
+        deduplicated = store.put(blob_path, data)
+
+    for path in paths:
+        store.link(blob_path, path)
+    store.record(digest, paths)
+
+    size = os.path.getsize(blob_path)
+    state = "linked to existing blob" if deduplicated else f"encoded in {encode_ms:.0f} ms"
+    print(f"[DEBUG] Saved {os.path.basename(paths[0])}: {size / 1024:.0f} KB, {state}")
+    return {"bytes": size, "encode_ms": round(encode_ms, 1), "deduplicated": deduplicated}
+
+
+class SaveQueue:
+    """
+    Runs save jobs on a thread pool and remembers the ones still running, so a
+    node can either wait for its own batch or return at once and let a later
+    node (or `wait()`) act as a flush barrier.
+    """
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rk_save")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error in background image save: {future.exception()}")
+
+    def wait(self, futures=None):
+        """Blocks until `futures` (default: every pending save) are written; re-raises the first error."""
+        if futures is None:
+            with self._lock:
+                futures = list(self._pending)
+        wait(futures)
+        for future in futures:
+            future.result()
+
+
+save_queue = SaveQueue(SAVE_WORKERS)
+# Previews get their own threads so they never queue behind full-size encodes
+preview_queue = SaveQueue(max(1, SAVE_WORKERS // 2))
+
+
+def finish_saves(futures, save_mode):
+    """
+    Applies the node's save_mode: "wait" blocks until this batch is on disk,
+    "background" returns immediately, "flush" also waits for every earlier
+    background save (put it on the last save node of a queue).
+    """
+    if save_mode == "flush":
+        save_queue.wait()
+    elif save_mode != "background":
+        save_queue.wait(futures)
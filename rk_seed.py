@@ -1,8 +1,96 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import re
 import random
 import math
+import functools
+import numpy as np
+
+# Upper bound on the points one sweep may generate
+MAX_SWEEP_POINTS = 100000
+
+
+def format_float(value, decimal_places):
+    """Format float to specified decimal places"""
+    format_str = f"{{:.{decimal_places}f}}"
+    return float(format_str.format(value))
+
+
+@functools.lru_cache(maxsize=64)
+def parse_custom_values(custom_values, decimal_places):
+    """Parses RK_seed's comma separated custom values once per (text, decimal_places)."""
+    return tuple(format_float(float(x.strip()), decimal_places) for x in custom_values.split(","))
+
+
+def parse_value_list(text):
+    """Floats separated by commas or newlines; empty entries are skipped."""
+    return np.array([float(x) for x in re.split(r"[,\n]", text) if x.strip()], dtype=np.float64)
+
+
+def parse_range(line):
+    """
+    One product axis: "start:end:points" (evenly spaced) or a comma separated list
+    of values. Returns (length, build) so the size is known before anything is allocated.
+    """
+    if ":" in line:
+        parts = [x.strip() for x in line.split(":")]
+        if len(parts) != 3:
+            raise ValueError(f"Invalid range '{line}', expected start:end:points")
+        start, end, count = float(parts[0]), float(parts[1]), int(parts[2])
+        return max(count, 0), lambda: np.linspace(start, end, count)
+    values = parse_value_list(line)
+    return len(values), lambda: values
+
+
+@functools.lru_cache(maxsize=32)
+def build_sweep_grid(sweep_mode, start_value, end_value, step_size, points, custom_values, product_ranges, decimal_places):
+    """
+    Generates the whole sweep at once as a read-only [N, dims] array, rounded
+    to decimal_places. Cached on its inputs, so re-running a graph (or taking
+    another slice) doesn't rebuild it.
+
+    linear: `points` evenly spaced values from start to end
+    step: start to end (inclusive) every step_size
+    log: `points` values from 10**start to 10**end, evenly spaced in log scale
+    geometric: `points` values from start to end with a constant ratio
+    custom: the values listed in custom_values
+    product: every combination of up to 3 axes, one per line of product_ranges
+    """
+    # Each axis is (length, build); every length is checked before any array is allocated
+    if sweep_mode == "linear":
+        axes = [(points, lambda: np.linspace(start_value, end_value, points))]
+    elif sweep_mode == "step":
+        count = max(int(math.floor((end_value - start_value) / step_size + 1e-9)) + 1, 1)
+        axes = [(count, lambda: start_value + step_size * np.arange(count))]
+    elif sweep_mode == "log":
+        axes = [(points, lambda: np.logspace(start_value, end_value, points))]
+    elif sweep_mode == "geometric":
+        if start_value <= 0 or end_value <= 0:
+            raise ValueError("Geometric sweeps need start_value and end_value above 0")
+        axes = [(points, lambda: np.geomspace(start_value, end_value, points))]
+    elif sweep_mode == "custom":
+        values = parse_value_list(custom_values)
+        axes = [(len(values), lambda: values)]
+    elif sweep_mode == "product":
+        axes = [parse_range(line) for line in product_ranges.splitlines() if line.strip()]
+        if not 1 <= len(axes) <= 3:
+            raise ValueError(f"product_ranges needs 1 to 3 lines, got {len(axes)}")
+    else:
+        raise ValueError(f"Unknown sweep mode: {sweep_mode}")
+
+    total = math.prod(max(length, 0) for length, _ in axes)
+    if total == 0:
+        raise ValueError("The sweep is empty")
+    if total > MAX_SWEEP_POINTS:
+        raise ValueError(f"The sweep has {total} points, more than {MAX_SWEEP_POINTS}")
+
+    axes = [build() for _, build in axes]
+    grid = np.stack([axis.ravel() for axis in np.meshgrid(*axes, indexing="ij")], axis=1)
+    grid = np.round(grid, decimal_places)
+    grid.flags.writeable = False
+    return grid
+
 
 class RK_seed:
     @classmethod
@@ -68,8 +156,7 @@ class RK_seed:
 
     def format_float(self, value, decimal_places):
         """Format float to specified decimal places"""
-        format_str = f"{{:.{decimal_places}f}}"
-        return float(format_str.format(value))
+        return format_float(value, decimal_places)
 
     def process_seed(self, seed, loop_mode, start_value, end_value, step_size, loop_count, decimal_places, custom_values=None):
         try:
@@ -86,9 +173,8 @@ class RK_seed:
             if loop_mode != "disabled":
                 if loop_mode == "fixed" and custom_values:
                     try:
-                        # Parse and format custom values
-                        self.values_list = [self.format_float(float(x.strip()), decimal_places) 
-                                          for x in custom_values.split(",")]
+                        # Parse and format custom values (cached per text)
+                        self.values_list = list(parse_custom_values(custom_values, decimal_places))
                         loop_value = self.values_list[self.current_index % len(self.values_list)]
                     except Exception as e:
                         print(f"Error parsing custom values: {e}")
@@ -149,12 +235,132 @@ class RK_seed:
             print(f"Error in RK_seed: {str(e)}")
             raise e
 
+class RK_Seed_Sweep:
+    """
+    Generates a whole parameter sweep in one execution (NumPy, cached) and
+    returns it as list outputs, so e.g. a 1,000-point CFG/denoise sweep runs
+    as one queued prompt instead of 1,000. value_1..value_3 are the axes of a
+    product sweep (value_2/value_3 repeat 0.0 for one-axis sweeps);
+    slice_start/slice_count return only part of the sweep.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "seed": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffffffff,
+                    "step": 1,
+                    "display": "number"
+                }),
+                "sweep_mode": (["linear", "step", "log", "geometric", "custom", "product"],),
+                "start_value": ("FLOAT", {
+                    "default": 4.0,
+                    "min": -1000000.0,
+                    "max": 1000000.0,
+                    "step": 0.1
+                }),
+                "end_value": ("FLOAT", {
+                    "default": 8.0,
+                    "min": -1000000.0,
+                    "max": 1000000.0,
+                    "step": 0.1
+                }),
+                "step_size": ("FLOAT", {
+                    "default": 0.5,
+                    "min": 0.000001,
+                    "max": 1000000.0,
+                    "step": 0.1
+                }),
+                "points": ("INT", {
+                    "default": 10,
+                    "min": 1,
+                    "max": MAX_SWEEP_POINTS,
+                    "step": 1
+                }),
+                "decimal_places": ("INT", {
+                    "default": 2,
+                    "min": 0,
+                    "max": 6,
+                    "step": 1
+                }),
+                "slice_start": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": MAX_SWEEP_POINTS,
+                    "step": 1
+                }),
+                # 0 = everything from slice_start on
+                "slice_count": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": MAX_SWEEP_POINTS,
+                    "step": 1
+                }),
+            },
+            "optional": {
+                "custom_values": ("STRING", {
+                    "multiline": True,
+                    "default": "0.1, 0.8, 1.6"
+                }),
+                # One axis per line: start:end:points or a comma separated list
+                "product_ranges": ("STRING", {
+                    "multiline": True,
+                    "default": "4:8:5\n0.5, 0.75, 1.0"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("SEED", "INT", "FLOAT", "FLOAT", "FLOAT", "INT", "STRING", "INT")
+    RETURN_NAMES = ("seed", "int", "value_1", "value_2", "value_3", "sweep_index", "value_string", "sweep_size")
+    OUTPUT_IS_LIST = (False, False, True, True, True, True, True, False)
+    FUNCTION = "generate_sweep"
+    CATEGORY = "RK_tools_v02"
+
+    def generate_sweep(self, seed, sweep_mode, start_value, end_value, step_size, points, decimal_places, slice_start, slice_count, custom_values="", product_ranges=""):
+        try:
+            if sweep_mode in ("linear", "step") and start_value > end_value:
+                start_value, end_value = end_value, start_value
+
+            grid = build_sweep_grid(sweep_mode, start_value, end_value, step_size, points, custom_values or "", product_ranges or "", decimal_places)
+
+            slice_end = len(grid) if slice_count == 0 else min(len(grid), slice_start + slice_count)
+            rows = grid[slice_start:slice_end]
+            if len(rows) == 0:
+                raise ValueError(f"slice_start {slice_start} is past the end of the sweep ({len(grid)} points)")
+
+            columns = [rows[:, d].tolist() for d in range(rows.shape[1])]
+            columns += [[0.0] * len(rows) for _ in range(3 - len(columns))]
+            value_strings = np.char.mod(f"%.{decimal_places}f", rows)
+            value_string = [", ".join(row) for row in value_strings.tolist()]
+            sweep_index = list(range(slice_start, slice_end))
+
+            print(f"[DEBUG] Sweep Mode: {sweep_mode}, Points: {len(grid)}, Returned: {slice_start}..{slice_end - 1}, {build_sweep_grid.cache_info()}")
+
+            return (
+                {"seed": int(seed)},  # SEED
+                int(seed),            # INT
+                columns[0],           # value_1
+                columns[1],           # value_2
+                columns[2],           # value_3
+                sweep_index,          # sweep_index
+                value_string,         # value_string
+                len(grid)             # sweep_size
+            )
+
+        except Exception as e:
+            print(f"Error in RK_Seed_Sweep: {str(e)}")
+            raise e
+
 # Node class mappings
 NODE_CLASS_MAPPINGS = {
-    "RK_seed": RK_seed
+    "RK_seed": RK_seed,
+    "RK_Seed_Sweep": RK_Seed_Sweep
 }
 
 # Node display name mappings
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "RK_seed": "🎲 RK Seed Loop"
+    "RK_seed": "🎲 RK Seed Loop",
+    "RK_Seed_Sweep": "🎲 RK Seed Sweep"
 }
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import sqlite3
+import threading
+
+# One SQLite database (WAL mode) shared by every node and every ComfyUI worker on this machine.
+# Point RK_STATE_DB elsewhere to share state between installs; avoid network filesystems.
+STATE_DB = os.environ.get("RK_STATE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rk_state.sqlite3"))
+
+
+class StateStore:
+    """
+    Small persistent key/value store for loop positions and counters.
+
+    Every `update` runs as a single IMMEDIATE transaction, so a read-modify-write
+    on one key is atomic across threads and processes: two workers looping
+    over the same sheet never get the same row or skip one.
+    Values are stored as JSON.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def update(self, key, default, advance):
+        """
+        Atomically replaces the value under `key` with `advance(value)`.
+        `default` (a value, or a callable evaluated only when the key is missing)
+        seeds new keys. Returns (old_value, new_value).
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                current = json.loads(row[0])
+            else:
+                current = default() if callable(default) else default
+            new_value = advance(current)
+            conn.execute(
+                "INSERT INTO state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(new_value)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return current, new_value
+
+    def get(self, key, default=None):
+        row = self._connection().execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set(self, key, value):
+        self.update(key, None, lambda _: value)
+
+
+def read_legacy_index(state_file, default):
+    """Index left in a per-looper text file by earlier versions, if any."""
+    if os.path.isfile(state_file):
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            pass
+    return default
+
+
+def advance_index(state_file, start_index, end_index, step_size):
+    """
+    Fetch-and-advance for the increment loop mode: returns the index to use now
+    and stores the next one (wrapping back to start_index after end_index).
+    `state_file` is the looper's old state file path; it is the key, and its
+    content seeds the key the first time so running loops keep their place.
+    """
+    def advance(index):
+        new_index = index + step_size
+        if new_index > end_index:
+            new_index = start_index
+        return new_index
+
+    key = os.path.abspath(state_file)
+    current_index, _ = state_store.update(key, lambda: read_legacy_index(state_file, start_index), advance)
+    return current_index
+
+
+state_store = StateStore(STATE_DB)
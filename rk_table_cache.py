@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Total budget for parsed tables kept in memory, shared by every table-reading node
+DEFAULT_MAX_MB = int(os.environ.get("RK_TABLE_CACHE_MB", "1024"))
+
+
+def estimate_nbytes(value):
+    """Rough in-memory size of a cached table."""
+    if hasattr(value, "nbytes"):  # CSVRowIndex, numpy arrays
+        return int(value.nbytes)
+    if hasattr(value, "memory_usage"):  # pandas DataFrame
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, list):  # csv rows as lists of str
+        total = sys.getsizeof(value)
+        for row in value:
+            total += sys.getsizeof(row) + sum(sys.getsizeof(cell) for cell in row)
+        return total
+    return sys.getsizeof(value)
+
+
+class TableCache:
+    """
+    Bounded LRU cache of parsed tables.
+
+    Entries are keyed on (absolute path, size, mtime_ns, parse options), so an
+    edited file is reloaded on its next use and the same file read with a
+    different delimiter or sheet is cached separately. When the total size of
+    the entries exceeds `max_bytes`, the least recently used ones are dropped
+    (and closed, if they hold open files or mappings).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._lock = threading.RLock()
+
+    def get(self, file_path, loader, **options):
+        """Returns the cached table for `file_path`, calling `loader()` on a miss."""
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_size, stat.st_mtime_ns, tuple(sorted(options.items())))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            # Drop (and close) older versions of this file before loading, so a loader that
+            # rewrites a sidecar at the same path (.rkxl, .rklines.npy) doesn't find it still mapped
+            self._remove_stale(key)
+
+        value = loader()
+        nbytes = estimate_nbytes(value)
+
+        with self._lock:
+            # Another thread may have cached an older version while this one was loading
+            self._remove_stale(key)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+        print(f"[DEBUG] Table cache loaded {file_path} ({nbytes / 2**20:.1f} MB), {self.stats()}")
+        return value
+
+    def _remove_stale(self, key):
+        for stale_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+            self._remove(stale_key)
+
+    def _remove(self, key):
+        value, nbytes = self._entries.pop(key)
+        self.total_bytes -= nbytes
+        if hasattr(value, "close"):
+            value.close()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_mb": round(self.total_bytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Process-wide cache used by the CSV and Excel nodes
+table_cache = TableCache(DEFAULT_MAX_MB * 2**20)
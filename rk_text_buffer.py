@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Spill files of the accumulator nodes (named per process, see RK_Accumulate_Text)
+SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rk_cache", "accumulate")
+
+
+def process_alive(pid):
+    try:
+        import psutil  # Ships with ComfyUI
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if os.name == "nt":
+        return True  # No safe check without psutil (os.kill would terminate it); keep the file
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_spill_path(name):
+    """Spill file of `name` for this process: `<SPILL_DIR>/<name>.<pid>.txt`."""
+    return os.path.join(SPILL_DIR, f"{name}.{os.getpid()}.txt")
+
+
+def remove_stale_spill_files(name):
+    """Deletes spill files of `name` left behind by processes that are no longer running."""
+    if not os.path.isdir(SPILL_DIR):
+        return
+    prefix = f"{name}."
+    for filename in os.listdir(SPILL_DIR):
+        if not (filename.startswith(prefix) and filename.endswith(".txt")):
+            continue
+        pid = filename[len(prefix):-len(".txt")]
+        if not pid.isdigit() or int(pid) == os.getpid() or process_alive(int(pid)):
+            continue
+        try:
+            os.remove(os.path.join(SPILL_DIR, filename))
+            print(f"[DEBUG] Removed spill file of exited process {pid}: {filename}")
+        except OSError as e:
+            print(f"[DEBUG] Could not remove spill file {filename}: {e}")
+
+
+class ChunkedTextBuffer:
+    """
+    Append-only text kept as a list of chunks with a running length, so adding a
+    block costs O(block) instead of copying everything accumulated so far.
+
+    The full string is only joined when `text()` is called, and cached until
+    the next append. With `spill_threshold` set (in characters), the buffer
+    moves to an append-only file at `spill_path` once it grows past the
+    threshold, and later blocks are appended to that file. A spilled buffer
+    keeps nothing in memory, so every `text()` call re-reads the whole file;
+    callers that only need the latest block should pass the file path on instead.
+    """
+
+    def __init__(self, spill_path=None, spill_threshold=0):
+        self.spill_path = spill_path
+        self.spill_threshold = spill_threshold
+        self.spilled = False
+        self.length = 0
+        self._chunks = []
+        self._text = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def is_empty(self):
+        return self.length == 0
+
+    def append(self, text):
+        if not text:
+            return
+        with self._lock:
+            self.length += len(text)
+            if self.spilled:
+                with open(self.spill_path, "a", encoding="utf-8", newline="") as f:
+                    f.write(text)
+                return
+            self._chunks.append(text)
+            self._text = None
+            if self.spill_path and 0 < self.spill_threshold < self.length:
+                self._spill()
+
+    def _spill(self):
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        with open(self.spill_path, "w", encoding="utf-8", newline="") as f:
+            f.writelines(self._chunks)
+        self._chunks = []
+        self.spilled = True
+        print(f"[DEBUG] Accumulated text spilled to {self.spill_path} ({self.length} characters)")
+
+    def text(self):
+        """The accumulated text as one string."""
+        with self._lock:
+            if self.spilled:
+                with open(self.spill_path, "r", encoding="utf-8", newline="") as f:
+                    return f.read()
+            if self._text is None:
+                self._text = "".join(self._chunks)
+                # Keep the joined string as the only chunk, so the next join copies it once
+                self._chunks = [self._text] if self._text else []
+            return self._text
+
+    def clear(self):
+        with self._lock:
+            if self.spilled and os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            self.spilled = False
+            self.length = 0
+            self._chunks = []
+            self._text = None
+
+
+class TextCheckpoint:
+    """
+    Append-only on-disk copy of an accumulator: `<base>.txt` holds the text,
+    `<base>.json` the committed byte size plus any counters. Only the first
+    `bytes` of the text file count, so a block whose counters never made it
+    to disk is dropped on load instead of being doubled.
+    """
+
+    def __init__(self, base):
+        self.text_path = base + ".txt"
+        self.state_path = base + ".json"
+        self.size = 0
+
+    def load(self):
+        """Returns (text, state) from disk, or None if there's no checkpoint."""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            with open(self.text_path, "rb") as f:
+                data = f.read(state["bytes"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(data) != state["bytes"]:
+            return None
+        self.size = len(data)
+        with open(self.text_path, "r+b") as f:
+            f.truncate(self.size)
+        return data.decode("utf-8"), state
+
+    def append(self, text, **state):
+        os.makedirs(os.path.dirname(self.text_path), exist_ok=True)
+        data = text.encode("utf-8")
+        with open(self.text_path, "ab") as f:
+            f.write(data)
+        self.size += len(data)
+        self._write_state(state)
+
+    def reset(self, text="", **state):
+        """Replaces the checkpoint with `text` (e.g. when checkpointing starts mid-run)."""
+        os.makedirs(os.path.dirname(self.text_path), exist_ok=True)
+        data = text.encode("utf-8")
+        with open(self.text_path, "wb") as f:
+            f.write(data)
+        self.size = len(data)
+        self._write_state(state)
+
+    def _write_state(self, state):
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(state, bytes=self.size), f)
+        os.replace(tmp_path, self.state_path)
+
+    def clear(self):
+        for path in (self.text_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.size = 0
+
+
+class SessionRegistry:
+    """
+    Bounded map of per-session state: entries unused for `ttl_seconds` are
+    dropped, and past `max_entries` the least recently used one goes.
+    `get(key)` creates missing entries with `factory(key)`.
+    """
+
+    def __init__(self, factory, max_entries=64, ttl_seconds=6 * 3600):
+        self.factory = factory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> [value, last_used], least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            while self._entries:
+                oldest_key, (_, last_used) = next(iter(self._entries.items()))
+                if now - last_used <= self.ttl_seconds:
+                    break
+                del self._entries[oldest_key]
+
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [self.factory(key), now]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                entry[1] = now
+                self._entries.move_to_end(key)
+            return entry[0]
+
+    def __len__(self):
+        return len(self._entries)
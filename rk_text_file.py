@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import mmap
+import random
+import contextlib
+import numpy as np
+
+# Newlines are located in slices of this many bytes, so indexing a multi-GB file stays within a small buffer
+SCAN_CHUNK = 64 * 2**20
+
+# Line index sidecar: a uint64 .npy array holding the file's size and mtime_ns, then every line start offset
+INDEX_SUFFIX = ".rklines.npy"
+
+# Optional per-line weight prefix for weighted sampling, e.g. "3::a red fox"
+# (spaces and tabs only: \s would let a blank line match the next line's prefix)
+WEIGHT_PATTERN = re.compile(r"[ \t]*(\d+(?:\.\d*)?)::")
+WEIGHT_PATTERN_BYTES = re.compile(WEIGHT_PATTERN.pattern.encode())
+
+
+def split_weight(line):
+    """Returns (weight, text) for a line with an optional "N::" prefix."""
+    match = WEIGHT_PATTERN.match(line)
+    if match is None:
+        return 1.0, line
+    return float(match.group(1)), line[match.end():]
+
+
+def decode_text(data):
+    return bytes(data).decode("utf-8", errors="replace")
+
+
+def strip_line_ending(data):
+    if data.endswith(b"\n"):
+        data = data[:-1]
+    if data.endswith(b"\r"):
+        data = data[:-1]
+    return data
+
+
+def scan_line_starts(buffer, size):
+    """Byte offsets (uint64) where each line of `buffer` starts; a trailing newline doesn't start a line."""
+    starts = [np.zeros(1, dtype=np.uint64)] if size else []
+    for chunk_start in range(0, size, SCAN_CHUNK):
+        chunk = np.frombuffer(buffer, dtype=np.uint8, count=min(SCAN_CHUNK, size - chunk_start), offset=chunk_start)
+        newlines = np.flatnonzero(chunk == 10).astype(np.uint64)
+        del chunk  # Release the mapping's buffer export before the next slice
+        newlines += np.uint64(chunk_start + 1)
+        starts.append(newlines)
+    line_starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.uint64)
+    if len(line_starts) and line_starts[-1] == size:
+        line_starts = line_starts[:-1]
+    return line_starts
+
+
+class TextFile:
+    """
+    Read-only text file. Byte ranges, the first N lines and single lines are
+    read with a short open/seek/read per call, so a multi-GB corpus is never
+    read into memory as a whole and no handle stays open between calls
+    (Windows won't let an editor save over a file that is open or mapped).
+
+    With `index_lines`, a table of line start offsets makes `line(i)` and
+    `random_line()` O(1). It is built once (one vectorized pass over a
+    temporary mapping) and persisted next to the file (`<file>.rklines.npy`)
+    keyed on its size and mtime, so later runs load it instead of rescanning.
+    """
+
+    def __init__(self, file_path, index_lines=False):
+        self.file_path = file_path
+        stat = os.stat(file_path)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.line_starts = None
+        self._cumulative_weights = None
+        if index_lines:
+            self.line_starts = self._load_index()
+            if self.line_starts is None:
+                with self._mapped() as mm:
+                    self.line_starts = scan_line_starts(mm, self.size)
+                self._save_index()
+
+    @contextlib.contextmanager
+    def _mapped(self):
+        """Maps the file for one scan; mmap refuses empty files, which simply have no lines."""
+        if not self.size:
+            yield b""
+            return
+        with open(self.file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+    def _read(self, start, end):
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    @property
+    def index_path(self):
+        return self.file_path + INDEX_SUFFIX
+
+    def _load_index(self):
+        try:
+            # Loaded into memory, so the sidecar isn't kept mapped either
+            index = np.load(self.index_path)
+        except (OSError, ValueError, EOFError):
+            return None
+        if index.dtype != np.uint64 or index.ndim != 1 or len(index) < 2:
+            return None
+        if (int(index[0]), int(index[1])) != (self.size, self.mtime_ns):
+            return None
+        return index[2:]
+
+    def _save_index(self):
+        header = np.array([self.size, self.mtime_ns], dtype=np.uint64)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp.npy"
+        try:
+            np.save(tmp_path, np.concatenate([header, self.line_starts]))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            # Read-only folder: the index is just rebuilt next time
+            print(f"[DEBUG] Could not save line index {self.index_path}: {e}")
+
+    @property
+    def nbytes(self):
+        """Resident size of the line index (the file itself is read on demand)."""
+        return 0 if self.line_starts is None else int(self.line_starts.nbytes)
+
+    @property
+    def line_count(self):
+        return len(self.line_starts)
+
+    def read_range(self, start=0, end=0):
+        """Decodes bytes [start, end); end <= 0 means the end of the file."""
+        end = self.size if end <= 0 else min(end, self.size)
+        start = max(0, min(start, end))
+        return decode_text(self._read(start, end))
+
+    def first_lines(self, count):
+        with open(self.file_path, "rb") as f:
+            data = b"".join(f.readline() for _ in range(count))
+        return decode_text(strip_line_ending(data))
+
+    def line(self, index):
+        start = int(self.line_starts[index])
+        end = int(self.line_starts[index + 1]) if index + 1 < len(self.line_starts) else self.size
+        return decode_text(strip_line_ending(self._read(start, end)))
+
+    def random_line(self, rng=random):
+        if not self.line_count:
+            return ""
+        return self.line(rng.randrange(self.line_count))
+
+    def cumulative_weights(self):
+        """
+        Running total of the line weights ("N::" prefixes, 1 otherwise), computed
+        once. Only lines starting with a digit or whitespace are parsed.
+        """
+        if self._cumulative_weights is None:
+            weights = np.ones(self.line_count, dtype=np.float64)
+            if self.line_count:
+                with self._mapped() as mm:
+                    data = np.frombuffer(mm, dtype=np.uint8)
+                    first_bytes = data[self.line_starts.astype(np.int64)]
+                    del data  # Release the mapping's buffer export before it's closed
+                    candidates = np.flatnonzero(((first_bytes >= ord("0")) & (first_bytes <= ord("9"))) | (first_bytes == ord(" ")) | (first_bytes == ord("\t")))
+                    for index in candidates:
+                        start = int(self.line_starts[index])
+                        match = WEIGHT_PATTERN_BYTES.match(mm, start, min(start + 64, self.size))
+                        if match is not None:
+                            weights[index] = float(match.group(1))
+            self._cumulative_weights = np.cumsum(weights)
+        return self._cumulative_weights
+
+    def weighted_index(self, start_index, end_index, rng=random):
+        """Index in [start_index, end_index] drawn in proportion to the line weights."""
+        cumulative = self.cumulative_weights()
+        low = cumulative[start_index - 1] if start_index > 0 else 0.0
+        high = cumulative[end_index]
+        if high <= low:
+            return rng.randint(start_index, end_index)
+        index = int(np.searchsorted(cumulative, rng.uniform(low, high), side="right"))
+        return min(max(index, start_index), end_index)
+
+    def close(self):
+        # Nothing is held open between calls
+        pass